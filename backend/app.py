@@ -1,30 +1,86 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, Response, request, jsonify
 from flask_cors import CORS
 import os
 import sys
+import csv
+import io
 import json
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# 加载.env（已设置的环境变量优先）。必须在导入后端模块之前执行：
+# 限流、LLM连接池、响应缓存、分段等模块在导入时读取配置
+load_dotenv()
 
 # 添加项目根目录到系统路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # 导入自定义模块
-from database.db_operations import DBOperations
-from backend.llm_integration import LLMService
-from backend.routes.regulation_analysis import regulation_analysis_bp
-
-# 初始化应用
-app = Flask(__name__)
-CORS(app)  # 允许跨域请求
+from database.db_operations import DBOperations, REGULATION_LIST_COLUMNS, next_page_cursor
+from backend.llm_integration import LLMService, is_failed_interpretation
+from backend.llm.http_client import reset_session
+from backend.llm.chunking import chunk_regulation
+from backend.jobs import JobQueue, fail_interrupted_jobs
+from backend.http_cache import cached_response, response_cache
+from backend.json_provider import init_json
+from backend.compression import init_compression
+from backend.metrics import init_metrics
+from backend.rate_limit import (
+    LLM_REQUEST_MAX_WAIT, RateLimitExceeded, client_id, llm_concurrency, llm_rate_limiter, rate_limit_response
+)
+from backend.routes.regulation_analysis import regulation_analysis_bp, llm_jobs, enqueue_llm_job
 
-# 注册蓝图
-app.register_blueprint(regulation_analysis_bp)
+# 接口蓝图，由create_app注册到应用
+api_bp = Blueprint('api', __name__)
 
-# 初始化数据库和LLM服务
+# 初始化数据库和LLM服务（导入模块时完成数据库结构检查与迁移，预加载模式下只在主进程执行一次）
 db = DBOperations()
 llm_service = LLMService()
 
-@app.route('/api/regulations', methods=['GET'])
+# 爬虫后台任务队列（爬取耗时较长，默认同一时间只运行一个爬取任务）
+crawler_jobs = JobQueue(db, max_workers=int(os.getenv('CRAWLER_JOB_WORKERS', 1)), name='crawler')
+
+def run_crawl_job(params, progress):
+    """爬取任务处理函数，在后台线程中执行"""
+    from backend.scrapers.mohrss_scraper import MohrssRegulationScraper
+    
+    scraper = MohrssRegulationScraper()
+    count = scraper.scrape_regulations(pages=params.get('pages', 1), progress_callback=progress.update)
+    progress.update(message=f'成功爬取 {count} 条法规')
+    return {'saved': count}
+
+crawler_jobs.register('crawl', run_crawl_job)
+
+def run_interpretation_job(params, progress):
+    """法规解读任务处理函数，在LLM任务队列中执行"""
+    regulation_id = params['regulation_id']
+    regulation = db.get_regulation_by_id(regulation_id)
+    if not regulation:
+        raise ValueError('法规不存在')
+    
+    progress.update(message='正在生成法规解读')
+    interpretation = llm_service.generate_regulation_interpretation(
+        regulation['content'],
+        regulation['title'],
+        use_cache=not params.get('force')
+    )
+    if is_failed_interpretation(interpretation):
+        # 不把错误信息保存为解读，任务标记为失败，可重新提交
+        raise RuntimeError(interpretation)
+    
+    # 保存解读到数据库（与已有解读相同时复用原记录）
+    interpretation_id = db.save_interpretation(regulation_id, interpretation)
+    
+    return {
+        'interpretation': interpretation,
+        'interpretation_id': interpretation_id
+    }
+
+llm_jobs.register('interpret', run_interpretation_job)
+
+@api_bp.route('/api/regulations', methods=['GET'])
+@cached_response()
 def get_regulations():
     """获取法规列表，支持搜索和分页"""
     try:
@@ -34,34 +90,94 @@ def get_regulations():
         end_date = request.args.get('end_date', None)
         limit = int(request.args.get('limit', 20))
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor', None)
+        sort = request.args.get('sort', None)
+        
+        # 从数据库获取数据（传入cursor时按游标翻页，忽略offset）
+        try:
+            regulations = db.get_regulations(
+                limit=limit,
+                offset=offset,
+                search_term=search_term,
+                start_date=start_date,
+                end_date=end_date,
+                cursor=cursor,
+                sort=sort
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # 从数据库获取数据
-        regulations = db.get_regulations(
-            limit=limit,
-            offset=offset,
+        # 计算总数（仅执行COUNT查询，结果按筛选条件缓存）
+        total = db.count_regulations(
             search_term=search_term,
             start_date=start_date,
             end_date=end_date
         )
         
-        # 计算总数
-        total = len(db.get_regulations(
-            search_term=search_term,
-            start_date=start_date,
-            end_date=end_date
-        ))
+        # 只有按日期排序的结果才能继续用游标翻页
+        date_ordered = bool(cursor) or not search_term or sort == 'date'
         
         return jsonify({
             'regulations': regulations,
             'total': total,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': next_page_cursor(regulations, limit) if date_ordered else None
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/regulations/<int:regulation_id>', methods=['GET'])
+@api_bp.route('/api/regulations/changes', methods=['GET'])
+def get_regulation_changes():
+    """获取法规变更记录（新增及正文变化），下游任务用next_since_id增量拉取"""
+    try:
+        since_id = int(request.args.get('since_id', 0))
+        limit = int(request.args.get('limit', 100))
+        
+        changes = db.get_regulation_changes(since_id=since_id, limit=limit)
+        
+        return jsonify({
+            'changes': changes,
+            'next_since_id': changes[-1]['id'] if changes else since_id
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/api/regulations/batch', methods=['GET'])
+@cached_response()
+def get_regulations_batch():
+    """批量获取法规详情及解读，ids为逗号分隔的法规ID（也可重复传ids参数）"""
+    try:
+        raw_ids = ','.join(request.args.getlist('ids'))
+        try:
+            regulation_ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids必须为逗号分隔的整数'}), 400
+        if not regulation_ids:
+            return jsonify({'error': '缺少ids参数'}), 400
+        
+        include_content = request.args.get('include_content', '1') != '0'
+        
+        try:
+            regulations = db.get_regulations_by_ids(regulation_ids, include_content=include_content)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        found_ids = {regulation['id'] for regulation in regulations}
+        
+        return jsonify({
+            'regulations': regulations,
+            'missing_ids': [regulation_id for regulation_id in dict.fromkeys(regulation_ids)
+                            if regulation_id not in found_ids]
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/api/regulations/<int:regulation_id>', methods=['GET'])
+@cached_response()
 def get_regulation_detail(regulation_id):
     """获取法规详情"""
     try:
@@ -80,64 +196,343 @@ def get_regulation_detail(regulation_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/regulations/<int:regulation_id>/interpret', methods=['POST'])
+@api_bp.route('/api/regulations/<int:regulation_id>/interpret', methods=['POST'])
 def interpret_regulation(regulation_id):
-    """解读法规"""
+    """解读法规，提交后台解读任务并返回202和任务ID，任务result中包含解读内容
+    
+    相同请求命中LLM响应缓存时不会重新生成，传入force=1时跳过缓存。
+    """
     try:
         regulation = db.get_regulation_by_id(regulation_id)
         if not regulation:
             return jsonify({'error': '法规不存在'}), 404
         
-        # 生成解读
-        interpretation = llm_service.generate_regulation_interpretation(
-            regulation['content'],
-            regulation['title']
-        )
-        
-        # 保存解读到数据库
-        interpretation_id = db.save_interpretation(regulation_id, interpretation)
-        
-        return jsonify({
-            'interpretation': interpretation,
-            'interpretation_id': interpretation_id
-        })
+        return enqueue_llm_job('interpret', regulation_id, force=request.args.get('force') == '1')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/timeline', methods=['GET'])
+def format_sse(event, data):
+    """格式化一条Server-Sent Events消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 长法规分段提炼期间发送SSE注释行的间隔（秒），防止客户端或反向代理因长时间无数据断开连接
+SSE_KEEPALIVE_INTERVAL = 10
+
+def _run_with_keepalive(func, *args, **kwargs):
+    """在后台线程中执行func，等待期间每隔SSE_KEEPALIVE_INTERVAL秒产出一行SSE注释
+    
+    Yields:
+        SSE注释行
+        
+    Returns:
+        func的返回值（作为生成器的返回值，用yield from取得）
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = executor.submit(func, *args, **kwargs)
+        while True:
+            try:
+                return future.result(timeout=SSE_KEEPALIVE_INTERVAL)
+            except FutureTimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        # 客户端断开时不等待后台调用结束，其结果仍会写入LLM响应缓存
+        executor.shutdown(wait=False)
+
+@api_bp.route('/api/regulations/<int:regulation_id>/interpret/stream', methods=['GET'])
+def stream_interpretation(regulation_id):
+    """流式解读法规（Server-Sent Events）
+    
+    依次推送delta事件（{"text": 文本片段}），生成完成后保存解读并推送
+    done事件（{"interpretation_id": 解读ID}）；出错时推送error事件。
+    命中LLM响应缓存时只推送一个包含完整解读的delta事件，传入force=1时跳过缓存。
+    
+    超过LLM_CHUNK_MAX_CHARS的长法规先推送progress事件（{"message": 说明}），
+    在事件流中分段提炼要点后再开始生成，提炼期间定期发送注释行保持连接。
+    """
+    regulation = db.get_regulation_by_id(regulation_id)
+    if not regulation:
+        return jsonify({'error': '法规不存在'}), 404
+    
+    force = request.args.get('force') == '1'
+    needs_condense = len(chunk_regulation(regulation['content'])) > 1
+    
+    # 先通过限流检查，超限时直接返回429，而不是建立事件流后再报错；
+    # 短法规同时在这里占用并发名额，长法规在分段提炼之后才占用。
+    # 请求线程最多等待LLM_REQUEST_MAX_WAIT秒，名额被后台任务占满时立即拒绝，不阻塞线程
+    slot_releases = []
+    try:
+        llm_rate_limiter.consume(client_id())
+        if not needs_condense:
+            slot_releases.append(llm_concurrency.acquire(max_wait=LLM_REQUEST_MAX_WAIT))
+    except RateLimitExceeded as e:
+        return rate_limit_response(e)
+    
+    def release_slot():
+        while slot_releases:
+            slot_releases.pop()()
+    
+    def generate():
+        parts = []
+        try:
+            regulation_text = regulation['content']
+            if needs_condense:
+                yield format_sse('progress', {'message': '法规较长，正在分段提炼要点'})
+                # 各段的提炼调用自行占用名额，完成后再占用名额流式生成解读
+                regulation_text = yield from _run_with_keepalive(
+                    llm_service.condense_regulation_text,
+                    regulation_text,
+                    regulation['title'],
+                    use_cache=not force,
+                    max_wait=LLM_REQUEST_MAX_WAIT
+                )
+                slot_releases.append(llm_concurrency.acquire(max_wait=LLM_REQUEST_MAX_WAIT))
+            
+            for text in llm_service.stream_regulation_interpretation(
+                regulation_text,
+                regulation['title'],
+                use_cache=not force
+            ):
+                parts.append(text)
+                yield format_sse('delta', {'text': text})
+            
+            # 生成完成后保存完整解读，中途出错或客户端断开时不保存
+            interpretation = ''.join(parts)
+            interpretation_id = db.save_interpretation(regulation_id, interpretation)
+            yield format_sse('done', {'interpretation_id': interpretation_id})
+        
+        except RateLimitExceeded as e:
+            yield format_sse('error', {'error': str(e), 'retry_after': e.retry_after})
+        except Exception as e:
+            yield format_sse('error', {'error': f'生成解读时出错: {str(e)}'})
+        finally:
+            release_slot()
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # 禁止nginx等反向代理缓冲，保证文本片段及时送达
+        'X-Accel-Buffering': 'no'
+    })
+    # 客户端在流开始前断开时生成器不会执行，关闭响应时同样释放名额
+    response.call_on_close(release_slot)
+    return response
+
+@api_bp.route('/api/timeline', methods=['GET'])
+@cached_response()
 def get_regulations_timeline():
     """获取法规时间轴"""
     try:
         limit = int(request.args.get('limit', 20))
-        regulations = db.get_regulations_timeline(limit=limit)
+        cursor = request.args.get('cursor', None)
         
-        return jsonify({'regulations': regulations})
+        try:
+            regulations = db.get_regulations_timeline(limit=limit, cursor=cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'regulations': regulations,
+            'next_cursor': next_page_cursor(regulations, limit)
+        })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/crawler/run', methods=['POST'])
+@api_bp.route('/api/stats/facets', methods=['GET'])
+@cached_response()
+def get_facets():
+    """获取法规数量统计（按年、月、分类、来源），用于时间轴和筛选项的直方图"""
+    try:
+        return jsonify(db.get_facets())
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 导出格式及对应的MIME类型
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+# 流式导出时累积到该字节数再输出一块，避免每行一次写入
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def parse_export_since(value):
+    """将since参数（日期或ISO 8601时间）转换为与updated_at一致的UTC时间字符串
+
+    Raises:
+        ValueError: 时间格式无效
+    """
+    try:
+        moment = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError('since必须为日期或ISO 8601格式的时间')
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def iter_export_lines(rows, export_format, columns):
+    """将法规逐条格式化为NDJSON或CSV文本行"""
+    if export_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            json.dumps(row[column], ensure_ascii=False) if isinstance(row[column], dict) else row[column]
+            for column in columns
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # 表头在没有数据行时也要输出
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@api_bp.route('/api/export', methods=['GET'])
+def export_regulations():
+    """流式导出法规数据
+
+    参数：
+        format: ndjson（默认）或csv
+        since: 只导出在该时间之后更新的法规，用于增量同步
+        include_content: 是否包含正文，默认1
+        include_analysis: 是否附带解读结果，默认0
+
+    响应头X-Export-Next-Since为本次导出开始时的数据库时间，下次增量导出时作为since传入。
+    边界时刻更新的法规可能在相邻两次导出中重复出现，下游按id去重即可。
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'format必须为ndjson或csv'}), 400
+
+        since = request.args.get('since')
+        if since:
+            try:
+                since = parse_export_since(since)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        include_content = request.args.get('include_content', '1') != '0'
+        include_analysis = request.args.get('include_analysis', '0') == '1'
+
+        columns = list(REGULATION_LIST_COLUMNS)
+        if include_content:
+            columns.append('content')
+        if include_analysis:
+            columns.append('analysis')
+
+        # 在开始读取之前取得时间，导出期间的更新会在下次增量导出中出现
+        next_since = db.get_current_timestamp()
+        rows = db.iter_regulations_for_export(
+            since=since,
+            include_content=include_content,
+            include_analysis=include_analysis
+        )
+
+        def generate():
+            chunk = []
+            size = 0
+            try:
+                for line in iter_export_lines(rows, export_format, columns):
+                    chunk.append(line)
+                    size += len(line)
+                    if size >= EXPORT_CHUNK_SIZE:
+                        yield ''.join(chunk)
+                        chunk = []
+                        size = 0
+                if chunk:
+                    yield ''.join(chunk)
+            except Exception as e:
+                # 响应头已经发出，只能中断传输，客户端据此判断导出不完整
+                print(f"导出法规时出错: {str(e)}")
+                raise
+            finally:
+                rows.close()
+
+        return Response(generate(), mimetype=EXPORT_FORMATS[export_format], headers={
+            'Content-Disposition': f'attachment; filename=regulations.{export_format}',
+            'Cache-Control': 'no-store',
+            'X-Export-Next-Since': next_since,
+            'X-Accel-Buffering': 'no'
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/api/crawler/run', methods=['POST'])
 def run_crawler():
-    """运行爬虫（仅用于演示，实际应用中可能需要身份验证和后台任务）"""
+    """提交爬虫后台任务，立即返回任务ID，通过/api/jobs/<id>查询进度（实际应用中需要身份验证）"""
     try:
-        from backend.scrapers.mohrss_scraper import MohrssRegulationScraper
-        
         # 获取要爬取的页数
-        data = request.get_json()
-        pages = data.get('pages', 1) if data else 1
+        data = request.get_json(silent=True)
+        try:
+            pages = int(data.get('pages', 1)) if data else 1
+        except (TypeError, ValueError):
+            return jsonify({'error': 'pages必须为整数'}), 400
         
-        # 运行爬虫
-        scraper = MohrssRegulationScraper()
-        count = scraper.scrape_regulations(pages=pages)
+        # 相同参数的爬取任务尚未结束时直接返回该任务，避免重复爬取
+        job_id, created = crawler_jobs.submit('crawl', {'pages': pages}, deduplicate=True)
         
         return jsonify({
             'success': True,
-            'message': f'成功爬取 {count} 条法规'
-        })
+            'job_id': job_id,
+            'created': created,
+            'status_url': f'/api/jobs/{job_id}',
+            'message': '爬取任务已提交' if created else '已有相同的爬取任务正在进行'
+        }), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询后台任务状态、进度计数和结果"""
+    try:
+        job = db.get_job(job_id)
+        if not job:
+            return jsonify({'error': '任务不存在'}), 404
+        
+        return jsonify({'job': job})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def create_app():
+    """创建Flask应用
+    
+    生产环境由backend/wsgi.py调用（gunicorn预加载模式下在主进程执行一次），
+    开发环境直接运行本文件。
+    """
+    app = Flask(__name__)
+    CORS(app)  # 允许跨域请求
+    init_json(app)  # 安装了orjson时使用orjson序列化
+    init_metrics(app)  # 请求耗时统计及/metrics接口，先注册以便计入压缩耗时
+    init_compression(app)  # 较大的响应按Accept-Encoding进行gzip/brotli压缩
+    
+    # 注册蓝图
+    app.register_blueprint(api_bp)
+    app.register_blueprint(regulation_analysis_bp)
+    
+    fail_interrupted_jobs(db)
+    # 关闭初始化用的数据库连接，避免fork出的工作进程继承同一个SQLite连接
+    db.close()
+    return app
+
+def init_worker():
+    """工作进程初始化，fork之后在每个工作进程中调用一次
+    
+    丢弃从主进程继承的数据库连接、LLM接口连接和缓存，各进程按需重新建立；
+    后台任务线程池在首次提交任务时才创建，因此不受fork影响。
+    """
+    DBOperations.reset_connections()
+    reset_session()
+    response_cache.clear()
+    # 被回收的工作进程中未完成的任务不会再继续，标记为失败
+    fail_interrupted_jobs(db)
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5001) 
\ No newline at end of file
+    # 开发服务器，生产环境请使用 gunicorn -c gunicorn.conf.py backend.wsgi:app
+    create_app().run(debug=True, host='0.0.0.0', port=5001)
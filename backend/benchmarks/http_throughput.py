@@ -0,0 +1,93 @@
+"""接口吞吐量基准测试
+
+以固定并发持续请求一组接口，输出每秒请求数和延迟分位数，用于对比
+开发服务器（python backend/app.py）与生产部署（gunicorn -c gunicorn.conf.py backend.wsgi:app）。
+
+用法:
+    python backend/benchmarks/http_throughput.py [--url http://127.0.0.1:5001] [--concurrency 16] [--duration 20]
+
+请求依次轮换法规详情（ID在1到--max-id之间轮换，大部分不会命中响应缓存）
+和法规列表、搜索、时间轴。
+"""
+import argparse
+import itertools
+import threading
+import time
+import urllib.request
+from urllib.parse import quote
+
+
+def build_paths(max_id):
+    """生成轮换请求的接口路径"""
+    list_paths = [
+        '/api/regulations?limit=20',
+        '/api/regulations?limit=20&offset=20',
+        f"/api/regulations?limit=20&search={quote('劳动合同')}",
+        '/api/timeline?limit=20',
+    ]
+    for regulation_id in itertools.cycle(range(1, max_id + 1)):
+        yield f'/api/regulations/{regulation_id}'
+        yield list_paths[regulation_id % len(list_paths)]
+
+
+def worker(base_url, paths, paths_lock, deadline, latencies, errors):
+    """持续发送请求直到截止时间"""
+    while time.monotonic() < deadline:
+        with paths_lock:
+            path = next(paths)
+        request = urllib.request.Request(base_url + path, headers={'Accept-Encoding': 'gzip'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(path)
+
+
+def percentile(values, p):
+    """计算分位数（values已排序）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * p))
+    return values[index]
+
+
+def run(base_url, concurrency, duration, max_id):
+    paths = build_paths(max_id)
+    paths_lock = threading.Lock()
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + duration
+
+    threads = [
+        threading.Thread(target=worker, args=(base_url, paths, paths_lock, deadline, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    print(f"目标: {base_url}  并发: {concurrency}  时长: {elapsed:.1f}s")
+    print(f"请求数: {len(latencies)}  失败: {len(errors)}  吞吐量: {len(latencies) / elapsed:.1f} 请求/秒")
+    print(f"延迟 p50: {percentile(latencies, 0.5) * 1000:.1f}ms  "
+          f"p95: {percentile(latencies, 0.95) * 1000:.1f}ms  "
+          f"p99: {percentile(latencies, 0.99) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='接口吞吐量基准测试')
+    parser.add_argument('--url', default='http://127.0.0.1:5001', help='后端服务地址')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发请求数')
+    parser.add_argument('--duration', type=float, default=20, help='测试时长（秒）')
+    parser.add_argument('--max-id', type=int, default=500, help='详情请求轮换的最大法规ID')
+    args = parser.parse_args()
+    run(args.url.rstrip('/'), args.concurrency, args.duration, args.max_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""接口JSON序列化与压缩基准测试
+
+对比/api/regulations列表页和法规详情的序列化耗时与传输字节数：
+    Flask默认     标准库json，ensure_ascii=True、sort_keys=True（改动前的行为）
+    标准库紧凑    标准库json，中文直接输出UTF-8
+    orjson        安装orjson后使用
+
+用法:
+    python backend/benchmarks/json_compression.py [--db database/legalguard.db] [--repeat 200]
+
+数据库中没有法规时使用生成的示例数据。
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+
+# 添加项目根目录到系统路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from database.db_operations import DBOperations, REGULATION_TEXT_SQL
+from backend.compression import GZIP_LEVEL, BROTLI_QUALITY, brotli
+from backend.json_provider import orjson
+
+SAMPLE_PHRASES = [
+    "用人单位应当依法建立和完善劳动规章制度", "保障劳动者享有劳动权利、履行劳动义务",
+    "县级以上人民政府人力资源社会保障行政部门", "负责本行政区域内的监督检查工作",
+    "劳动合同期满或者当事人约定的终止条件出现", "按照国家有关规定缴纳基本养老保险费",
+    "工伤职工在停工留薪期内", "原工资福利待遇不变，由所在单位按月支付",
+    "失业保险金的标准不得低于城市居民最低生活保障标准", "用人单位未按时足额缴纳社会保险费的",
+    "由社会保险费征收机构责令限期缴纳或者补足", "并自欠缴之日起按日加收万分之五的滞纳金",
+    "职业技能等级认定机构应当遵循客观、公正、科学、规范的原则", "对劳动争议仲裁委员会作出的裁决不服的",
+    "可以自收到仲裁裁决书之日起十五日内向人民法院提起诉讼", "本办法自发布之日起施行",
+]
+
+
+def sample_regulations(count=100, content_chars=8000):
+    """生成示例法规数据，正文由常见条文短语随机组合而成"""
+    rng = random.Random(0)
+    regulations = []
+    for i in range(1, count + 1):
+        paragraphs = []
+        n = 1
+        while sum(len(p) for p in paragraphs) < content_chars:
+            sentence = "，".join(rng.sample(SAMPLE_PHRASES, rng.randint(2, 4)))
+            paragraphs.append(f"第{n}条 {sentence}；金额为{rng.randint(100, 99999)}元，期限为{rng.randint(1, 90)}日。")
+            n += 1
+        regulations.append({
+            'id': i,
+            'title': f'人力资源社会保障部关于示例政策的通知（第{i}号）',
+            'publish_date': '2024-01-01',
+            'effective_date': '2024-02-01',
+            'implementation_date': '2024-02-01',
+            'source': '人力资源和社会保障部',
+            'category': '劳动关系',
+            'url': f'https://www.mohrss.gov.cn/example/{i}.html',
+            'content_hash': '0' * 64,
+            'created_at': '2024-01-01 00:00:00',
+            'updated_at': '2024-01-01 00:00:00',
+            'content': '\n'.join(paragraphs)
+        })
+    return regulations
+
+
+def load_payloads(db_path):
+    """构造与接口一致的响应数据：列表第一页（20条、100条）和最长的一条法规详情"""
+    payloads = {}
+    db = DBOperations(db_path) if os.path.exists(db_path) else None
+    
+    if db and db.count_regulations() > 0:
+        for limit in (20, 100):
+            regulations = db.get_regulations(limit=limit)
+            payloads[f'列表 limit={limit}'] = {
+                'regulations': regulations, 'total': db.count_regulations(),
+                'limit': limit, 'offset': 0, 'next_cursor': None
+            }
+        longest_id = db.get_connection().execute(
+            f"SELECT id FROM regulations ORDER BY length({REGULATION_TEXT_SQL}) DESC LIMIT 1"
+        ).fetchone()[0]
+        payloads['详情（最长正文）'] = {
+            'regulation': db.get_regulation_by_id(longest_id),
+            'interpretations': db.get_interpretations(longest_id)
+        }
+        source = db_path
+    else:
+        regulations = sample_regulations()
+        for limit in (20, 100):
+            rows = [{k: v for k, v in reg.items() if k != 'content'} for reg in regulations[:limit]]
+            payloads[f'列表 limit={limit}'] = {
+                'regulations': rows, 'total': len(regulations),
+                'limit': limit, 'offset': 0, 'next_cursor': None
+            }
+        payloads['详情（示例正文）'] = {'regulation': regulations[0], 'interpretations': []}
+        source = '示例数据'
+    
+    return source, payloads
+
+
+def encoders():
+    """参与对比的序列化方式，均返回UTF-8字节"""
+    result = {
+        'Flask默认': lambda obj: json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8'),
+        '标准库紧凑': lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+    }
+    if orjson is not None:
+        result['orjson'] = lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return result
+
+
+def _timed(func, repeat):
+    """执行repeat次并返回平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run(db_path, repeat):
+    source, payloads = load_payloads(db_path)
+    print(f"数据来源: {source}，每项重复 {repeat} 次")
+    if orjson is None:
+        print("未安装orjson，跳过orjson对比")
+    if brotli is None:
+        print("未安装brotli，跳过brotli对比")
+    
+    header = f"{'序列化':<10}{'编码(ms)':>10}{'原始字节':>12}{'gzip字节':>12}{'gzip(ms)':>10}"
+    if brotli is not None:
+        header += f"{'br字节':>12}{'br(ms)':>10}"
+    
+    for name, payload in payloads.items():
+        print(f"\n== {name} ==")
+        print(header)
+        for encoder_name, encode in encoders().items():
+            body = encode(payload)
+            encode_ms = _timed(lambda: encode(payload), repeat)
+            gz = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            gzip_ms = _timed(lambda: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), max(1, repeat // 10))
+            line = f"{encoder_name:<10}{encode_ms:>10.3f}{len(body):>12}{len(gz):>12}{gzip_ms:>10.3f}"
+            if brotli is not None:
+                br = brotli.compress(body, quality=BROTLI_QUALITY)
+                br_ms = _timed(lambda: brotli.compress(body, quality=BROTLI_QUALITY), max(1, repeat // 10))
+                line += f"{len(br):>12}{br_ms:>10.3f}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='接口JSON序列化与压缩基准测试')
+    parser.add_argument('--db', default='database/legalguard.db', help='数据库文件路径')
+    parser.add_argument('--repeat', type=int, default=200, help='每项测试的重复次数')
+    args = parser.parse_args()
+    run(args.db, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+# 响应体超过该字节数才压缩，小响应压缩收益不抵开销
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/csv')
+# 按ETag缓存压缩结果，命中响应缓存的请求无需重复压缩
+COMPRESSED_CACHE_MAX_ENTRIES = 256
+
+
+def compress_body(data, encoding):
+    """按指定编码压缩响应体"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encodings):
+    """根据Accept-Encoding选择压缩编码，优先brotli，不支持压缩时返回None"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+class _CompressedCache:
+    """压缩结果的LRU缓存，以(ETag, 编码)为键"""
+
+    def __init__(self, max_entries=COMPRESSED_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_compressed_cache = _CompressedCache()
+
+
+def compress_response(response):
+    """after_request钩子：对足够大的文本响应进行gzip/brotli压缩
+
+    流式响应（如SSE）、非200响应和已编码的响应不处理。压缩后ETag改为弱校验，
+    客户端回传时仍能与未压缩内容的ETag匹配（If-None-Match按弱比较）。
+    """
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    etag, weak = response.get_etag()
+    cache_key = (etag, encoding) if etag else None
+    compressed = _compressed_cache.get(cache_key) if cache_key else None
+    if compressed is None:
+        compressed = compress_body(data, encoding)
+        if cache_key:
+            _compressed_cache.set(cache_key, compressed)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """为应用注册响应压缩"""
+    app.after_request(compress_response)
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from database.db_operations import DBOperations
+
+# 响应缓存的有效期（秒）和最大条目数
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 60))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 512))
+# 浏览器缓存时间（秒），0表示每次都带If-None-Match向服务器确认
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 0))
+
+# 用于读取数据库写入代数
+db = DBOperations()
+
+
+class ResponseCache:
+    """进程内的接口响应缓存（LRU + TTL）
+
+    缓存条目记录生成时的数据库写入代数，数据库有任何写入后旧条目即失效，
+    包括gunicorn其他worker和单独运行的爬虫脚本的写入（见DBOperations.get_write_generation）。
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        """获取未过期且写入代数一致的缓存条目，没有时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['generation'] != generation or time.monotonic() - entry['created'] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, generation, body, mimetype, etag):
+        """保存缓存条目，超过上限时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = {
+                'generation': generation,
+                'created': time.monotonic(),
+                'body': body,
+                'mimetype': mimetype,
+                'etag': etag
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _cache_key():
+    """缓存键：路径加排序后的查询参数，参数顺序不同的相同请求共用缓存"""
+    args = sorted(request.args.items(multi=True))
+    return request.path, tuple(args)
+
+
+def _finalize(response, etag, max_age):
+    """设置ETag和Cache-Control，If-None-Match匹配时转换为304响应"""
+    response.set_etag(etag)
+    if max_age > 0:
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def cached_response(max_age=HTTP_CACHE_MAX_AGE):
+    """接口响应缓存装饰器
+
+    命中缓存时直接返回缓存的响应体，不查询数据库也不重新序列化JSON；
+    所有200响应都带ETag，客户端携带匹配的If-None-Match时返回304。
+    非200响应（如404、202）不缓存。
+
+    Args:
+        max_age: Cache-Control的max-age（秒）
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # 先读取写入代数再执行查询，查询期间发生的写入会让该条目下次失效
+            generation = db.get_write_generation()
+            key = _cache_key()
+
+            entry = response_cache.get(key, generation)
+            if entry is not None:
+                response = Response(entry['body'], mimetype=entry['mimetype'])
+                return _finalize(response, entry['etag'], max_age)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            response_cache.set(key, generation, body, response.mimetype, etag)
+            return _finalize(response, etag, max_age)
+        return wrapper
+    return decorator
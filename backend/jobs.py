@@ -0,0 +1,197 @@
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+# LLM解读任务的并发数和最大积压数，积压超过上限时拒绝新任务
+LLM_JOB_WORKERS = int(os.getenv('LLM_JOB_WORKERS', 4))
+LLM_JOB_MAX_PENDING = int(os.getenv('LLM_JOB_MAX_PENDING', 100))
+
+
+class JobQueueFull(Exception):
+    """任务积压达到上限"""
+
+    def __init__(self, retry_after=30):
+        super().__init__("任务队列已满，请稍后重试")
+        self.retry_after = retry_after
+
+
+class JobProgress:
+    """任务进度上报器，传给任务处理函数用于更新进度计数"""
+
+    def __init__(self, db, job_id):
+        self.db = db
+        self.job_id = job_id
+        self.counters = {}
+
+    def update(self, message=None, **counters):
+        """更新进度计数并写入任务记录
+
+        Args:
+            message: 当前进度说明
+            counters: 进度计数，如 processed=3, total=20，与已有计数合并
+        """
+        self.counters.update(counters)
+        update_fields = {'progress': self.counters}
+        if message is not None:
+            update_fields['message'] = message
+        self.db.update_job(self.job_id, update_fields)
+
+
+class JobQueue:
+    """后台任务队列
+
+    任务记录持久化在jobs表中，由线程池在后台执行，接口只负责提交任务并立即返回任务ID，
+    调用方通过get_job轮询状态和进度。
+    """
+
+    def __init__(self, db, max_workers=1, name='jobs', max_pending=None):
+        """初始化任务队列
+
+        Args:
+            db: DBOperations实例
+            max_workers: 同时执行的任务数
+            name: 线程名前缀
+            max_pending: 排队及运行中任务数上限，None表示不限制
+        """
+        self.db = db
+        self.max_workers = max_workers
+        self.name = name
+        self.max_pending = max_pending
+        self._handlers = {}
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.RLock()
+
+    def register(self, job_type, handler):
+        """注册任务处理函数
+
+        Args:
+            job_type: 任务类型
+            handler: 处理函数 handler(params, progress)，返回值作为任务结果保存
+        """
+        self._handlers[job_type] = handler
+
+    def _get_executor(self):
+        """首次提交任务时才创建线程池，避免多进程部署时在fork之前启动线程"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name
+                )
+            return self._executor
+
+    def submit(self, job_type, params=None, deduplicate=False):
+        """提交后台任务
+
+        Args:
+            job_type: 任务类型，必须已注册
+            params: 任务参数字典
+            deduplicate: 为True时，若已有参数相同且未完成的同类任务则直接返回该任务
+
+        Returns:
+            (任务ID, 是否新建)
+
+        Raises:
+            JobQueueFull: 积压任务数达到max_pending
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"未注册的任务类型: {job_type}")
+
+        params = params or {}
+        # 查重和创建在同一把锁内完成，避免并发请求重复创建相同任务
+        with self._lock:
+            if deduplicate:
+                existing_id = self.db.find_active_job(job_type, params)
+                if existing_id:
+                    return existing_id, False
+
+            if self.max_pending is not None and self._pending >= self.max_pending:
+                raise JobQueueFull()
+
+            job_id = self.db.create_job(job_type, params, worker_pid=os.getpid())
+            self._pending += 1
+            self._get_executor().submit(self._run, job_id, job_type, params)
+        return job_id, True
+
+    def _run(self, job_id, job_type, params):
+        """在工作线程中执行任务并记录结果"""
+        try:
+            self._execute(job_id, job_type, params)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _execute(self, job_id, job_type, params):
+        """执行任务处理函数，保存结果或错误信息"""
+        self.db.update_job(job_id, {'status': JOB_RUNNING, 'started_at': True})
+        progress = JobProgress(self.db, job_id)
+
+        try:
+            result = self._handlers[job_type](params, progress)
+            self.db.update_job(job_id, {
+                'status': JOB_SUCCEEDED,
+                'result': result,
+                'finished_at': True
+            })
+        except Exception as e:
+            print(f"后台任务执行失败: job_id={job_id}, 类型={job_type}, 错误: {e}")
+            traceback.print_exc()
+            self.db.update_job(job_id, {
+                'status': JOB_FAILED,
+                'error': str(e),
+                'finished_at': True
+            })
+
+    def shutdown(self, wait=True):
+        """关闭线程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+def _process_alive(pid):
+    """判断进程是否仍在运行"""
+    if pid == os.getpid():
+        return True
+    if not pid or os.name == 'nt':
+        # Windows下os.kill(pid, 0)会发送CTRL_C_EVENT，无法用于探测；Windows只支持单进程部署
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fail_interrupted_jobs(db):
+    """将所属进程已退出的未完成任务标记为失败
+
+    服务重启后，原进程中排队或运行的任务不会再继续执行，需要在启动时清理，
+    否则轮询方会一直看到running状态。
+
+    Returns:
+        标记为失败的任务数量
+    """
+    count = 0
+    for job in db.get_unfinished_jobs():
+        if not _process_alive(job['worker_pid']):
+            db.update_job(job['id'], {
+                'status': JOB_FAILED,
+                'error': '服务重启，任务已中断',
+                'finished_at': True
+            })
+            count += 1
+    if count:
+        print(f"已将 {count} 个中断的后台任务标记为失败")
+    return count
@@ -0,0 +1,50 @@
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """标准库JSON序列化，中文直接输出为UTF-8且不排序、不缩进
+
+    默认的ensure_ascii会把每个汉字转义成6字节的\\uXXXX，法规正文的体积因此翻倍。
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+
+
+class OrjsonProvider(JSONProvider):
+    """使用orjson序列化，速度约为标准库的数倍，直接输出UTF-8字节"""
+
+    # 字典键允许非字符串（如按年份统计的整数键），与标准库行为一致
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """直接使用orjson输出的字节作为响应体，省去一次解码"""
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self._default, option=self.option)
+        return self._app.response_class(body, mimetype='application/json')
+
+    @staticmethod
+    def _default(obj):
+        """处理orjson不支持的类型（如Decimal、set），交给Flask默认的转换逻辑"""
+        return DefaultJSONProvider.default(obj)
+
+
+def init_json(app):
+    """为应用设置JSON序列化：安装了orjson时使用orjson，否则使用紧凑的标准库序列化"""
+    provider_class = OrjsonProvider if orjson else CompactJSONProvider
+    app.json_provider_class = provider_class
+    app.json = provider_class(app)
+    return provider_class
+
@@ -0,0 +1,76 @@
+"""长法规分段
+
+超过单次调用长度上限的法规按条（第X条）切分，相邻条文合并为不超过上限的段落，
+各段并发交给LLM分析后再合并结果，避免截断正文或超出模型上下文。
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# 单次LLM调用中法规正文的最大字数，超过时分段处理
+LLM_CHUNK_MAX_CHARS = int(os.getenv('LLM_CHUNK_MAX_CHARS', 8000))
+# 同一法规并发分析的段数上限（实际并发同时受LLM_MAX_CONCURRENCY限制）
+LLM_CHUNK_WORKERS = int(os.getenv('LLM_CHUNK_WORKERS', 4))
+
+# 行首的“第X条”或“第X章”，作为切分位置
+ARTICLE_BOUNDARY = re.compile(r'^[ \t　]*第[0-9一二三四五六七八九十百千零〇两]+[条章]', re.MULTILINE)
+# 单条过长时依次尝试的切分位置：换行、句号
+FALLBACK_SEPARATORS = ('\n', '。')
+
+
+def split_articles(content):
+    """按条切分法规正文，第一条之前的内容（标题、序言等）单独作为一段"""
+    starts = [match.start() for match in ARTICLE_BOUNDARY.finditer(content)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(content))
+    return [content[start:end] for start, end in zip(starts, starts[1:]) if content[start:end].strip()]
+
+
+def _split_long_text(text, max_chars):
+    """将超过上限的单条文本按换行或句号切开，仍然过长时按字数硬切"""
+    pieces = []
+    while len(text) > max_chars:
+        cut = -1
+        for separator in FALLBACK_SEPARATORS:
+            cut = text.rfind(separator, 0, max_chars)
+            if cut > 0:
+                cut += len(separator)
+                break
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def chunk_regulation(content, max_chars=LLM_CHUNK_MAX_CHARS):
+    """将法规正文切分为不超过max_chars字的段落，尽量在条与条之间切分
+
+    Returns:
+        段落列表，正文不超过上限时只有一段
+    """
+    if len(content) <= max_chars:
+        return [content]
+
+    chunks = []
+    current = ''
+    for article in split_articles(content):
+        for piece in _split_long_text(article, max_chars):
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ''
+            current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def map_chunks(func, chunks, max_workers=LLM_CHUNK_WORKERS):
+    """并发处理各段，按原顺序返回结果；任一段抛出异常时向上抛出"""
+    if len(chunks) == 1:
+        return [func(0, chunks[0])]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        return list(executor.map(func, range(len(chunks)), chunks))
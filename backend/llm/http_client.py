@@ -0,0 +1,133 @@
+"""LLM接口共用的HTTP客户端
+
+所有LLM调用共享一个带连接池的requests.Session，复用keep-alive连接，
+避免每次请求都重新进行TCP和TLS握手。请求默认带有连接/读取超时，
+遇到429、5xx或连接失败时按指数退避（带随机抖动）重试，服务端返回
+Retry-After时按其指定的时间等待。
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.metrics import llm_retries
+
+# 每个主机保持的连接数，应不小于同时进行的LLM调用数
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 10))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 10))
+# 读超时：非流式请求为等待完整响应的时间，流式请求为相邻两个数据块之间的间隔
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', 120))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))
+LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', 1))
+# 单次重试的最长等待秒数，Retry-After超过该值时不再重试
+LLM_RETRY_MAX_WAIT = float(os.getenv('LLM_RETRY_MAX_WAIT', 30))
+
+# 可以重试的响应状态码
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """获取共享的Session，首次使用时创建"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=LLM_POOL_SIZE, pool_maxsize=LLM_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def reset_session():
+    """丢弃共享的Session，用于fork出的子进程（连接不能跨进程使用）"""
+    global _session
+    with _session_lock:
+        _session = None
+
+
+def parse_retry_after(value):
+    """解析Retry-After响应头（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, retry_after=None):
+    """计算第attempt次重试（从0开始）前的等待秒数
+
+    没有Retry-After时在[0, 退避上限]内随机取值（full jitter），避免多个调用同时重试；
+    有Retry-After时在其基础上增加少量随机延迟。
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, LLM_RETRY_BACKOFF)
+    return random.uniform(0, min(LLM_RETRY_MAX_WAIT, LLM_RETRY_BACKOFF * (2 ** attempt)))
+
+
+def post(url, client, timeout=None, max_retries=LLM_MAX_RETRIES, **kwargs):
+    """通过共享Session发送POST请求，失败时自动重试
+
+    只重试连接失败和可重试的状态码，读超时不重试（模型可能已经在生成）。
+    流式请求只在收到响应头之前重试。重试用尽后返回最后一次的响应，
+    由调用方通过raise_for_status处理。
+
+    Args:
+        url: 请求地址
+        client: 调用方名称，用于重试次数统计
+        timeout: (连接超时, 读超时)，默认使用LLM_CONNECT_TIMEOUT和LLM_READ_TIMEOUT
+        max_retries: 最多重试次数
+        **kwargs: 传给requests的其他参数（headers、json、stream等）
+
+    Returns:
+        requests.Response
+
+    Raises:
+        requests.RequestException: 重试用尽后仍无法连接，或读超时
+    """
+    if timeout is None:
+        timeout = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+    session = get_session()
+
+    attempt = 0
+    while True:
+        try:
+            response = session.post(url, timeout=timeout, **kwargs)
+        except requests.exceptions.ConnectionError:
+            # ConnectTimeout也是ConnectionError的子类；ReadTimeout不是，直接抛出
+            if attempt >= max_retries:
+                raise
+            llm_retries.inc(client=client, reason='connection')
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+            return response
+
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is not None and retry_after > LLM_RETRY_MAX_WAIT:
+            return response
+
+        response.close()
+        llm_retries.inc(client=client, reason=str(response.status_code))
+        time.sleep(backoff_delay(attempt, retry_after))
+        attempt += 1
@@ -1,7 +1,23 @@
 import os
 import json
+import re
+import time
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+from backend.llm import http_client
+from backend.llm.chunking import chunk_regulation, map_chunks
+from backend.llm.response_cache import llm_response_cache
+from backend.metrics import record_llm_call
+from backend.rate_limit import llm_concurrency
+from database.db_operations import ANALYSIS_ITEM_TYPES, API_ERROR_PREFIX
+
+# 模型常把JSON包在```json代码块中返回
+CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*(.*?)\s*```$', re.DOTALL)
+
+def is_failed_analysis(analysis: Dict[str, Any]) -> bool:
+    """解读结果是否来自失败的API调用（而不是模型的回复）"""
+    return str(analysis.get("raw_response", "")).startswith(API_ERROR_PREFIX)
 
 class RegulationAnalyzer:
     """法规解读模块 - 调用LLM API解读法规内容"""
@@ -23,27 +39,51 @@ class RegulationAnalyzer:
             "Authorization": f"Bearer {self.api_key}"
         }
     
-    def analyze_regulation(self, title: str, content: str) -> Dict[str, Any]:
+    def analyze_regulation(self, title: str, content: str, use_cache: bool = True) -> Dict[str, Any]:
         """分析法规内容，提取重点并生成解读
         
+        正文超过LLM_CHUNK_MAX_CHARS时按条切分为多段并发分析，再合并为同样格式的结果，
+        保证长法规的全文都被分析，耗时接近单次调用。
+        
         Args:
             title: 法规标题
             content: 法规全文内容
+            use_cache: 是否使用LLM响应缓存，为False时重新生成并覆盖缓存
             
         Returns:
             包含解读结果的字典
+            
+        Raises:
+            ValueError: 分段分析时有段落的回复无法解析为JSON
         """
-        # 构建提示词
-        prompt = self._build_prompt(title, content)
+        chunks = chunk_regulation(content)
+        if len(chunks) == 1:
+            # 构建提示词并调用LLM API
+            prompt = self._build_prompt(title, content)
+            response = self._call_llm_api(prompt, use_cache=use_cache)
+            return self._parse_response(response)
+        
+        def analyze_chunk(index, chunk):
+            prompt = self._build_prompt(title, chunk, part=(index + 1, len(chunks)))
+            return self._parse_response(self._call_llm_api(prompt, use_cache=use_cache))
         
-        # 调用LLM API
-        response = self._call_llm_api(prompt)
+        partial_results = map_chunks(analyze_chunk, chunks)
+        return self._merge_results(title, partial_results, use_cache=use_cache)
+    
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """解析LLM返回的解读结果
         
-        # 解析结果
+        Args:
+            response: API响应结果
+            
+        Returns:
+            解读结果字典，无法解析为JSON时保留原始响应
+        """
         try:
-            # 这里假设API返回的是JSON格式的字符串
+            # 这里假设API返回的是JSON格式的字符串（允许包在代码块中）
             # 实际使用时根据选择的API进行修改
-            analysis_result = json.loads(response)
+            fenced = CODE_FENCE_PATTERN.match(response.strip())
+            analysis_result = json.loads(fenced.group(1) if fenced else response)
             return analysis_result
         except json.JSONDecodeError:
             # 如果不是JSON格式，则直接返回结果
@@ -54,23 +94,74 @@ class RegulationAnalyzer:
                 "raw_response": response  # 原始响应
             }
     
-    def _build_prompt(self, title: str, content: str) -> str:
+    def _merge_results(self, title: str, partial_results: List[Dict[str, Any]], use_cache: bool = True) -> Dict[str, Any]:
+        """合并各段的解读结果
+        
+        列表字段按顺序去重合并；摘要和关键要点再调用一次LLM，根据各段的摘要和要点
+        归纳为全文的结果（输入输出都很短），失败时退回直接拼接。
+        
+        Args:
+            title: 法规标题
+            partial_results: 各段的解读结果，按正文顺序排列
+            use_cache: 是否使用LLM响应缓存
+            
+        Returns:
+            与单次解读格式相同的结果字典，chunk_count为分段数
+            
+        Raises:
+            ValueError: 有段落的回复无法解析为JSON
+        """
+        failed = [result for result in partial_results if is_failed_analysis(result)]
+        if failed:
+            # 有段落调用失败时不返回不完整的解读
+            return failed[0]
+        
+        unparsed = [i for i, result in enumerate(partial_results, 1) if "raw_response" in result]
+        if unparsed:
+            # 丢弃这些段落会得到只覆盖部分正文的解读，视为失败
+            raise ValueError(f"第{'、'.join(map(str, unparsed))}段的解读结果无法解析为JSON")
+        
+        merged = {"summary": "", "chunk_count": len(partial_results)}
+        for item_type in ANALYSIS_ITEM_TYPES:
+            values = []
+            for result in partial_results:
+                items = result.get(item_type) or []
+                values.extend(item for item in items if isinstance(item, str) and item not in values)
+            merged[item_type] = values
+        
+        summaries = [result["summary"] for result in partial_results if isinstance(result.get("summary"), str)]
+        prompt = self._build_merge_prompt(title, summaries, merged["key_points"])
+        combined = self._parse_response(self._call_llm_api(prompt, use_cache=use_cache))
+        if "raw_response" not in combined and isinstance(combined.get("summary"), str):
+            merged["summary"] = combined["summary"]
+            if isinstance(combined.get("key_points"), list) and combined["key_points"]:
+                merged["key_points"] = combined["key_points"]
+        else:
+            merged["summary"] = "".join(summaries)[:500]
+        return merged
+    
+    def _build_prompt(self, title: str, content: str, part: Optional[Tuple[int, int]] = None) -> str:
         """构建用于法规解读的提示词
         
         Args:
             title: 法规标题
-            content: 法规全文内容
+            content: 法规全文内容，分段分析时为其中一段
+            part: 分段分析时为(段序号, 总段数)
             
         Returns:
             格式化的提示词
         """
+        scope = ""
+        if part:
+            scope = f"（以下为法规正文的第{part[0]}/{part[1]}部分，请只根据这一部分作答，摘要概括这一部分的内容）\n"
+        
         # 构建结构化提示词以获得更好的解读效果
         prompt = f"""
 请以专业法律顾问的角色，对以下法规进行全面解读。
 法规标题：{title}
-
+{scope}
 法规内容：
-{content[:8000]}  # 限制内容长度，避免超出API限制
+{content}
 
 请提供以下格式的分析：
 1. 简明摘要：用200字以内概括该法规的主要内容和目的
@@ -92,11 +183,42 @@ class RegulationAnalyzer:
 """
         return prompt
     
-    def _call_llm_api(self, prompt: str) -> str:
-        """调用LLM API
+    def _build_merge_prompt(self, title: str, summaries: List[str], key_points: List[str]) -> str:
+        """构建合并分段解读结果的提示词
+        
+        Args:
+            title: 法规标题
+            summaries: 各段的摘要
+            key_points: 各段关键要点合并后的列表
+            
+        Returns:
+            格式化的提示词
+        """
+        summary_text = "\n".join(f"{i}. {summary}" for i, summary in enumerate(summaries, 1))
+        key_point_text = "\n".join(f"- {point}" for point in key_points)
+        prompt = f"""
+以下是对法规《{title}》各部分分别解读得到的摘要和关键要点，请据此归纳全文的解读。
+
+各部分摘要：
+{summary_text}
+
+各部分关键要点：
+{key_point_text}
+
+请以JSON格式返回结果，包含以下字段：
+{{
+  "summary": "用200字以内概括该法规的主要内容和目的",
+  "key_points": ["从上述要点中归纳出的5-10个全文关键要点"]
+}}
+"""
+        return prompt
+    
+    def _call_llm_api(self, prompt: str, use_cache: bool = True) -> str:
+        """调用LLM API，相同请求优先返回缓存的回复
         
         Args:
             prompt: 提示词
+            use_cache: 是否使用LLM响应缓存
             
         Returns:
             API响应结果
@@ -113,22 +235,43 @@ class RegulationAnalyzer:
             "max_tokens": 2000   # 控制响应长度
         }
         
+        cached = llm_response_cache.get(payload, 'regulation_analyzer', bypass=not use_cache)
+        if cached is not None:
+            return cached
+        
+        # 占用全局LLM并发名额，排队超时抛出RateLimitExceeded
+        with llm_concurrency.slot():
+            return self._post_chat_completion(payload)
+    
+    def _post_chat_completion(self, payload: Dict[str, Any]) -> str:
+        """发送chat completions请求并提取回复内容
+        
+        Args:
+            payload: 请求体
+            
+        Returns:
+            API响应结果
+        """
+        start = time.perf_counter()
         try:
-            response = requests.post(
+            response = http_client.post(
                 self.api_endpoint,
+                'regulation_analyzer',
                 headers=self.headers,
-                json=payload,
-                timeout=60  # 设置较长的超时时间
+                json=payload
             )
             
             response.raise_for_status()
             result = response.json()
+            record_llm_call('regulation_analyzer', time.perf_counter() - start, usage=result.get("usage"))
             
             # 根据实际API响应结构提取内容
             # 这里以OpenAI API为例
             content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+            llm_response_cache.set(payload, content)
             return content
             
         except requests.exceptions.RequestException as e:
+            record_llm_call('regulation_analyzer', time.perf_counter() - start, error=e)
             print(f"调用LLM API失败: {e}")
-            return f"API调用失败: {str(e)}" 
\ No newline at end of file
+            return f"{API_ERROR_PREFIX}: {str(e)}" 
\ No newline at end of file
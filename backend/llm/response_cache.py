@@ -0,0 +1,120 @@
+"""LLM响应缓存
+
+以(模型, 系统提示词, 用户提示词, temperature)的哈希为键缓存LLM的完整回复，
+相同请求不再重复生成。缓存分两级：进程内LRU，以及数据库中的llm_response_cache表
+（多个工作进程和命令行脚本共享，重启后仍然有效）。只缓存成功的回复。
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from backend.metrics import llm_cache_requests
+from database.db_operations import DBOperations
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', '1') == '1'
+# 进程内缓存的最大条目数
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 256))
+
+
+def make_cache_key(payload):
+    """根据chat completions请求体计算缓存键
+
+    只取决定回复内容的字段：模型、系统提示词、用户提示词和temperature；
+    stream、max_tokens等不影响缓存命中。
+    """
+    messages = payload.get('messages', [])
+    system_prompt = '\n'.join(m['content'] for m in messages if m.get('role') == 'system')
+    prompt = '\n'.join(m['content'] for m in messages if m.get('role') != 'system')
+    raw = json.dumps(
+        [payload.get('model'), system_prompt, prompt, payload.get('temperature')],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """两级LLM响应缓存（进程内LRU + SQLite）"""
+
+    def __init__(self, db_path='database/legalguard.db', max_entries=LLM_CACHE_MEMORY_ENTRIES,
+                 enabled=LLM_CACHE_ENABLED):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _get_db(self):
+        """首次访问数据库时才创建DBOperations，避免导入模块时就打开数据库"""
+        if self._db is None:
+            self._db = DBOperations(self.db_path)
+        return self._db
+
+    def get(self, payload, client, bypass=False):
+        """查找请求对应的缓存回复
+
+        Args:
+            payload: chat completions请求体
+            client: 调用方名称，用于命中率统计
+            bypass: 为True时跳过缓存（如用户主动要求重新生成）
+
+        Returns:
+            缓存的回复文本，未命中时返回None
+        """
+        if bypass or not self.enabled:
+            llm_cache_requests.inc(client=client, result='bypass')
+            return None
+
+        key = make_cache_key(payload)
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+        if response is not None:
+            llm_cache_requests.inc(client=client, result='memory_hit')
+            return response
+
+        try:
+            response = self._get_db().get_llm_cache_entry(key)
+        except Exception as e:
+            print(f"读取LLM响应缓存失败: {e}")
+            response = None
+        if response is None:
+            llm_cache_requests.inc(client=client, result='miss')
+            return None
+
+        llm_cache_requests.inc(client=client, result='disk_hit')
+        self._remember(key, response)
+        return response
+
+    def set(self, payload, response):
+        """保存成功的回复，空回复不缓存
+
+        绕过缓存重新生成的回复同样会保存，覆盖旧的缓存。
+        """
+        if not self.enabled or not response:
+            return
+        key = make_cache_key(payload)
+        self._remember(key, response)
+        try:
+            self._get_db().save_llm_cache_entry(key, payload.get('model'), response)
+        except Exception as e:
+            # 缓存写入失败不影响本次调用结果
+            print(f"保存LLM响应缓存失败: {e}")
+
+    def _remember(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空进程内缓存（数据库中的缓存保留）"""
+        with self._lock:
+            self._entries.clear()
+
+
+llm_response_cache = LLMResponseCache()
@@ -1,11 +1,24 @@
 import os
-import requests
+import time
 import json
 from dotenv import load_dotenv
 
-# 加载环境变量
+# 加载环境变量（在导入下列模块之前，它们在导入时读取配置）
 load_dotenv()
 
+from backend.llm import http_client
+from backend.llm.chunking import chunk_regulation, map_chunks
+from backend.llm.response_cache import llm_response_cache
+from backend.metrics import record_llm_call
+from backend.rate_limit import RateLimitExceeded, llm_concurrency
+
+# generate_regulation_interpretation失败时返回的文本前缀（未配置密钥、调用API出错）
+INTERPRETATION_ERROR_PREFIXES = ("错误：", "生成解读时出错")
+
+def is_failed_interpretation(interpretation):
+    """解读文本是否为generate_regulation_interpretation返回的错误信息（而不是模型的回复）"""
+    return str(interpretation).startswith(INTERPRETATION_ERROR_PREFIXES)
+
 class LLMService:
     """LLM服务集成类"""
     
@@ -15,44 +28,206 @@ class LLMService:
         self.api_base = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
         self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
     
-    def generate_regulation_interpretation(self, regulation_text, title=None):
-        """生成法规解读"""
+    def generate_regulation_interpretation(self, regulation_text, title=None, use_cache=True):
+        """生成法规解读，相同请求优先返回缓存的解读
+        
+        Args:
+            regulation_text: 法规正文，过长时先分段提炼要点再解读
+            title: 法规标题
+            use_cache: 是否使用LLM响应缓存，为False时重新生成并覆盖缓存
+        """
         if not self.api_key:
             return "错误：未配置API密钥。请在.env文件中设置OPENAI_API_KEY。"
         
-        # 构建提示词
-        prompt = self._build_interpretation_prompt(regulation_text, title)
-        
         try:
-            # 调用OpenAI API
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+            regulation_text = self.condense_regulation_text(regulation_text, title, use_cache=use_cache)
+            
+            # 构建提示词并调用OpenAI API
+            prompt = self._build_interpretation_prompt(regulation_text, title)
+            data = self._build_chat_payload(prompt)
+            return self._complete(data, 'llm_service', use_cache=use_cache)
+        
+        except RateLimitExceeded:
+            # 排队超时不是解读结果，交给调用方处理
+            raise
+        except Exception as e:
+            return f"生成解读时出错: {str(e)}"
+    
+    def condense_regulation_text(self, regulation_text, title=None, use_cache=True, max_wait=None):
+        """正文超过单次调用上限时，按条分段并发提炼各段要点，返回用于解读的文本
+        
+        正文不超过LLM_CHUNK_MAX_CHARS时原样返回。各段的提炼调用分别占用LLM并发名额，
+        调用方在此期间不应持有名额。
+        
+        Args:
+            regulation_text: 法规正文
+            title: 法规标题
+            use_cache: 是否使用LLM响应缓存
+            max_wait: 各段调用排队等待名额的最长秒数，默认使用LLM_QUEUE_MAX_WAIT
             
-            data = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": "你是一位专业的劳动法规分析师，擅长解读和分析劳动法规文件，并将其转化为通俗易懂的解释。"},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 2000
-            }
+        Returns:
+            法规正文或各段要点拼接成的文本
             
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=data
-            )
-            response.raise_for_status()
+        Raises:
+            ValueError: 需要分段但未配置API密钥
+            RateLimitExceeded: 排队超时
+            requests.RequestException: 调用API失败
+        """
+        chunks = chunk_regulation(regulation_text)
+        if len(chunks) == 1:
+            return regulation_text
+        if not self.api_key:
+            raise ValueError("未配置API密钥。请在.env文件中设置OPENAI_API_KEY。")
+        
+        def extract(index, chunk):
+            data = self._build_chat_payload(self._build_extract_prompt(chunk, title, index + 1, len(chunks)))
+            # 提炼要点要求忠实于原文
+            data["temperature"] = 0.1
+            return self._complete(data, 'llm_service', use_cache=use_cache, max_wait=max_wait)
+        
+        notes = map_chunks(extract, chunks)
+        return "\n\n".join(f"【第{i}部分要点】\n{note}" for i, note in enumerate(notes, 1))
+    
+    def _complete(self, data, client, use_cache=True, max_wait=None):
+        """发送非流式chat completions请求并返回回复内容，优先使用缓存
+        
+        Args:
+            data: 请求体
+            client: 调用方名称，用于指标统计
+            use_cache: 是否使用LLM响应缓存
+            max_wait: 排队等待名额的最长秒数，默认使用LLM_QUEUE_MAX_WAIT
+            
+        Raises:
+            RateLimitExceeded: 排队超时
+            requests.RequestException: 调用API失败
+        """
+        cached = llm_response_cache.get(data, client, bypass=not use_cache)
+        if cached is not None:
+            return cached
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        # 占用全局LLM并发名额，排队超时抛出RateLimitExceeded
+        with llm_concurrency.slot(max_wait):
+            start = time.perf_counter()
+            try:
+                response = http_client.post(
+                    f"{self.api_base}/chat/completions",
+                    client,
+                    headers=headers,
+                    json=data
+                )
+                response.raise_for_status()
+                result = response.json()
+            except Exception as e:
+                record_llm_call(client, time.perf_counter() - start, error=e)
+                raise
+            record_llm_call(client, time.perf_counter() - start, usage=result.get("usage"))
+        
+        content = result["choices"][0]["message"]["content"]
+        llm_response_cache.set(data, content)
+        return content
+    
+    def stream_regulation_interpretation(self, regulation_text, title=None, use_cache=True):
+        """流式生成法规解读，使用chat completions的stream模式
+        
+        流式响应持续时间较长，由调用方在返回响应前占用llm_concurrency名额，
+        以便排队超时时能直接返回429。与非流式解读共用LLM响应缓存，
+        命中时一次返回完整解读。
+        
+        本方法不做分段，长法规应先在占用名额之前调用condense_regulation_text。
+        
+        Args:
+            regulation_text: 法规正文（或condense_regulation_text的结果）
+            title: 法规标题
+            use_cache: 是否使用LLM响应缓存
             
-            result = response.json()
-            interpretation = result["choices"][0]["message"]["content"]
-            return interpretation
+        Yields:
+            模型逐步生成的文本片段
+            
+        Raises:
+            ValueError: 未配置API密钥
+            requests.RequestException: 调用API失败
+        """
+        if not self.api_key:
+            raise ValueError("未配置API密钥。请在.env文件中设置OPENAI_API_KEY。")
         
+        prompt = self._build_interpretation_prompt(regulation_text, title)
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        data = self._build_chat_payload(prompt)
+        cached = llm_response_cache.get(data, 'llm_service_stream', bypass=not use_cache)
+        if cached is not None:
+            yield cached
+            return
+        data["stream"] = True
+        
+        start = time.perf_counter()
+        usage = None
+        parts = []
+        try:
+            # 读超时针对相邻两个数据块之间的间隔，而不是整个生成过程
+            with http_client.post(
+                f"{self.api_base}/chat/completions",
+                'llm_service_stream',
+                headers=headers,
+                json=data,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                # text/event-stream未声明字符集时requests会按ISO-8859-1解码，需显式指定
+                response.encoding = 'utf-8'
+                
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    
+                    chunk = json.loads(payload)
+                    # 部分服务在最后一个数据块中返回usage
+                    usage = chunk.get("usage") or usage
+                    choices = chunk.get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        yield delta
         except Exception as e:
-            return f"生成解读时出错: {str(e)}"
+            record_llm_call('llm_service_stream', time.perf_counter() - start, error=e)
+            raise
+        record_llm_call('llm_service_stream', time.perf_counter() - start, usage=usage)
+        llm_response_cache.set(data, ''.join(parts))
+    
+    def _build_chat_payload(self, prompt):
+        """构建chat completions请求体"""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "你是一位专业的劳动法规分析师，擅长解读和分析劳动法规文件，并将其转化为通俗易懂的解释。"},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 2000
+        }
+    
+    def _build_extract_prompt(self, chunk, title, part, total):
+        """构建长法规分段提炼要点的提示词"""
+        title_text = f"《{title}》" if title else "该法规"
+        
+        prompt = f"""
+以下是{title_text}正文的第{part}/{total}部分。请逐条提炼这一部分的全部关键规定：
+注明条款序号，保留期限、金额、比例、适用条件等具体要求，不要展开解释，不要遗漏条款。
+
+法规内容：
+{chunk}
+"""
+        return prompt
     
     def _build_interpretation_prompt(self, regulation_text, title=None):
         """构建法规解读的提示词"""
@@ -0,0 +1,252 @@
+"""进程内指标统计，以Prometheus文本格式通过/metrics导出
+
+包含接口请求延迟、DBOperations各方法的查询次数与耗时、LLM调用延迟/token用量/错误数/重试数/缓存命中、
+爬虫抓取页数与速度。指标保存在当前进程内存中，gunicorn多工作进程部署时每次抓取
+只反映处理该请求的工作进程，Prometheus端按实例汇总即可。
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+from database.db_operations import DBOperations
+
+# 延迟直方图的分桶上界（秒），覆盖从毫秒级查询到分钟级LLM调用
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape_label_value(value):
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    """格式化标签，如 {route="/api/regulations",status="200"}"""
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    """格式化数值，整数不带小数点"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """指标基类，按标签值分别保存数据"""
+
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.extend(self._render_sample(labelvalues, value))
+        return lines
+
+    def _render_sample(self, labelvalues, value):
+        return [f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可任意设置的数值"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """分桶统计的观测值分布（如延迟）"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """统计代码块的执行耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, labelvalues, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['counts']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(float(bound))))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, labelvalues, ('le', '+Inf'))
+        lines.append(f'{self.name}_bucket{labels} {state["count"]}')
+        labels = _format_labels(self.labelnames, labelvalues)
+        lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+        lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """输出Prometheus文本格式"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# 接口请求
+http_request_duration = registry.register(Histogram(
+    'legalguard_http_request_duration_seconds', '接口请求处理耗时', ('method', 'route', 'status')
+))
+
+# 数据库操作
+db_operation_duration = registry.register(Histogram(
+    'legalguard_db_operation_duration_seconds', 'DBOperations方法执行耗时', ('operation',)
+))
+db_statements = registry.register(Counter(
+    'legalguard_db_statements_total', 'DBOperations方法执行的SQL语句数', ('operation',)
+))
+db_operation_errors = registry.register(Counter(
+    'legalguard_db_operation_errors_total', 'DBOperations方法抛出异常的次数', ('operation',)
+))
+
+# LLM调用
+llm_request_duration = registry.register(Histogram(
+    'legalguard_llm_request_duration_seconds', 'LLM接口调用耗时', ('client', 'outcome')
+))
+llm_tokens = registry.register(Counter(
+    'legalguard_llm_tokens_total', 'LLM接口返回的token用量', ('client', 'type')
+))
+llm_errors = registry.register(Counter(
+    'legalguard_llm_errors_total', 'LLM接口调用失败次数', ('client', 'error')
+))
+llm_retries = registry.register(Counter(
+    'legalguard_llm_retries_total', 'LLM接口请求重试次数', ('client', 'reason')
+))
+llm_cache_requests = registry.register(Counter(
+    'legalguard_llm_cache_requests_total', 'LLM响应缓存查询次数（memory_hit、disk_hit、miss、bypass）',
+    ('client', 'result')
+))
+
+# 爬虫
+scraper_fetch_duration = registry.register(Histogram(
+    'legalguard_scraper_fetch_duration_seconds', '爬虫抓取单个页面的耗时', ('outcome',)
+))
+scraper_pages_per_second = registry.register(Gauge(
+    'legalguard_scraper_pages_per_second', '最近一次爬取任务的平均抓取速度（页/秒，含请求间隔）'
+))
+
+
+def record_llm_call(client, duration, usage=None, error=None):
+    """记录一次LLM调用
+
+    Args:
+        client: 调用方，如'llm_service'、'regulation_analyzer'
+        duration: 耗时（秒）
+        usage: 接口返回的usage字段（prompt_tokens、completion_tokens）
+        error: 失败时的异常
+    """
+    outcome = 'error' if error is not None else 'success'
+    llm_request_duration.observe(duration, client=client, outcome=outcome)
+    if error is not None:
+        llm_errors.inc(client=client, error=type(error).__name__)
+    if usage:
+        for token_type in ('prompt_tokens', 'completion_tokens'):
+            if usage.get(token_type):
+                llm_tokens.inc(usage[token_type], client=client, type=token_type.replace('_tokens', ''))
+
+
+def _record_db_operation(operation, duration, statements, failed):
+    """DBOperations操作监听函数"""
+    db_operation_duration.observe(duration, operation=operation)
+    db_statements.inc(statements, operation=operation)
+    if failed:
+        db_operation_errors.inc(operation=operation)
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _observe_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        # 使用路由模板而不是实际路径，避免每个法规ID产生一组指标
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_duration.observe(
+            time.perf_counter() - start,
+            method=request.method, route=route, status=response.status_code
+        )
+    return response
+
+
+def metrics_view():
+    """/metrics接口"""
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    """为应用注册请求计时和/metrics接口，并开始统计数据库操作"""
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    DBOperations.add_operation_listener(_record_db_operation)
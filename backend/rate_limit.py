@@ -0,0 +1,135 @@
+"""LLM调用的准入控制与限流
+
+- 全局并发上限：同一进程内同时进行的LLM调用不超过LLM_MAX_CONCURRENCY，
+  超出的调用排队等待，后台任务最多等待LLM_QUEUE_MAX_WAIT秒，超时则拒绝；
+  请求线程（流式解读）最多等待LLM_REQUEST_MAX_WAIT秒（默认不等待），
+  避免名额被后台任务占满时阻塞处理其他请求的线程。
+- 按客户端的令牌桶：每个客户端（IP）每分钟最多提交LLM_RATE_PER_MINUTE次会调用LLM的请求，
+  允许LLM_RATE_BURST次突发。只作用于会产生LLM调用的请求，已有解读的读取不受影响。
+
+被拒绝的请求返回429和Retry-After。
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import jsonify, request
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+LLM_QUEUE_MAX_WAIT = float(os.getenv('LLM_QUEUE_MAX_WAIT', 30))
+LLM_REQUEST_MAX_WAIT = float(os.getenv('LLM_REQUEST_MAX_WAIT', 0))
+LLM_RATE_PER_MINUTE = float(os.getenv('LLM_RATE_PER_MINUTE', 10))
+LLM_RATE_BURST = int(os.getenv('LLM_RATE_BURST', 5))
+# 部署在反向代理之后时设为1，按X-Forwarded-For识别客户端
+RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', '0') == '1'
+
+# 令牌桶数量超过该值时清理已经回满的桶
+TOKEN_BUCKET_MAX_CLIENTS = 10000
+
+
+class RateLimitExceeded(Exception):
+    """请求被限流或排队超时"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """全局并发上限，超出时排队等待"""
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_wait=LLM_QUEUE_MAX_WAIT):
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def acquire(self, max_wait=None):
+        """获取一个调用名额
+
+        Args:
+            max_wait: 最长等待秒数，默认使用LLM_QUEUE_MAX_WAIT
+
+        Returns:
+            释放名额的函数，可重复调用，只有第一次生效
+
+        Raises:
+            RateLimitExceeded: 等待超时
+        """
+        wait = self.max_wait if max_wait is None else max_wait
+        if not self._semaphore.acquire(timeout=wait):
+            raise RateLimitExceeded("LLM服务繁忙，请稍后重试", retry_after=max(1, math.ceil(wait)))
+
+        released = threading.Event()
+
+        def release():
+            if not released.is_set():
+                released.set()
+                self._semaphore.release()
+        return release
+
+    @contextmanager
+    def slot(self, max_wait=None):
+        """以with语句占用一个调用名额"""
+        release = self.acquire(max_wait)
+        try:
+            yield
+        finally:
+            release()
+
+
+class TokenBucketLimiter:
+    """按客户端的令牌桶限流"""
+
+    def __init__(self, rate_per_minute=LLM_RATE_PER_MINUTE, burst=LLM_RATE_BURST):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, client):
+        """为客户端消耗一个令牌
+
+        Raises:
+            RateLimitExceeded: 令牌不足，retry_after为下一个令牌可用的秒数
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[client] = (tokens, now)
+                retry_after = math.ceil((1 - tokens) / self.rate) if self.rate > 0 else 60
+                raise RateLimitExceeded("请求过于频繁，请稍后重试", retry_after=max(1, retry_after))
+
+            self._buckets[client] = (tokens - 1, now)
+            if len(self._buckets) > TOKEN_BUCKET_MAX_CLIENTS:
+                self._prune(now)
+
+    def _prune(self, now):
+        """清理已经回满的令牌桶（调用方持有锁）"""
+        full = [
+            client for client, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate >= self.capacity
+        ]
+        for client in full:
+            del self._buckets[client]
+
+
+llm_concurrency = ConcurrencyLimiter()
+llm_rate_limiter = TokenBucketLimiter()
+
+
+def client_id():
+    """当前请求的客户端标识"""
+    if RATE_LIMIT_TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+
+def rate_limit_response(error):
+    """限流时的429响应"""
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
@@ -5,21 +5,89 @@ import sys
 # 添加项目根目录到系统路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from database.db_operations import DBOperations
-from backend.llm.regulation_analyzer import RegulationAnalyzer
+from backend.llm.regulation_analyzer import RegulationAnalyzer, is_failed_analysis
+from backend.http_cache import cached_response
+from backend.rate_limit import RateLimitExceeded, client_id, llm_rate_limiter, rate_limit_response
+from backend.jobs import JobQueue, JobQueueFull, LLM_JOB_WORKERS, LLM_JOB_MAX_PENDING
 
 # 创建蓝图
 regulation_analysis_bp = Blueprint('regulation_analysis', __name__)
 db = DBOperations()
 
+# LLM解读任务队列，解读法规和生成AI解读共用，限制同时调用LLM的数量
+llm_jobs = JobQueue(db, max_workers=LLM_JOB_WORKERS, name='llm', max_pending=LLM_JOB_MAX_PENDING)
+
+def run_analysis_job(params, progress):
+    """AI解读任务处理函数，在后台线程中调用LLM并保存解读结果"""
+    regulation_id = params['regulation_id']
+    regulation = db.get_regulation_by_id(regulation_id)
+    if not regulation:
+        raise ValueError("法规不存在")
+    
+    progress.update(message='正在调用LLM解读法规')
+    analyzer = RegulationAnalyzer()
+    analysis = analyzer.analyze_regulation(
+        title=regulation["title"],
+        content=regulation["content"],
+        use_cache=not params.get('force')
+    )
+    if is_failed_analysis(analysis):
+        # 不保存失败的调用结果，任务标记为失败，可重新提交
+        raise RuntimeError(analysis["raw_response"])
+    
+    # 保存解读结果到数据库（已有解读时覆盖），记录所依据的正文版本
+    db.update_regulation_analysis(regulation_id, analysis, content_hash=regulation.get("content_hash"))
+    return analysis
+
+llm_jobs.register('analyze', run_analysis_job)
+
+def enqueue_llm_job(job_type, regulation_id, force=False):
+    """提交LLM任务并返回202响应，相同法规未完成的任务直接复用
+    
+    每次提交消耗客户端一个令牌，令牌不足时返回429。
+    
+    Args:
+        job_type: 任务类型
+        regulation_id: 法规ID
+        force: 是否跳过LLM响应缓存重新生成
+        
+    Returns:
+        Flask响应
+    """
+    try:
+        llm_rate_limiter.consume(client_id())
+    except RateLimitExceeded as e:
+        return rate_limit_response(e)
+    
+    try:
+        params = {'regulation_id': regulation_id}
+        if force:
+            params['force'] = True
+        job_id, created = llm_jobs.submit(job_type, params, deduplicate=True)
+    except JobQueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    
+    return jsonify({
+        "job_id": job_id,
+        "created": created,
+        "status_url": f"/api/jobs/{job_id}"
+    }), 202
+
 @regulation_analysis_bp.route('/api/regulation/analyze/<int:regulation_id>', methods=['GET'])
+@cached_response()
 def analyze_regulation(regulation_id):
     """获取法规解读
     
+    已有解读时直接返回；否则提交后台解读任务并返回202和任务ID，
+    任务完成后其result即为解读结果，也可再次请求本接口获取。
+    
     Args:
         regulation_id: 法规ID
         
     Returns:
-        法规解读结果
+        法规解读结果，或202及任务ID
     """
     try:
         # 从数据库获取法规
@@ -32,30 +100,23 @@ def analyze_regulation(regulation_id):
         if analysis_result:
             return jsonify(analysis_result), 200
         
-        # 调用LLM解读法规
-        analyzer = RegulationAnalyzer()
-        analysis = analyzer.analyze_regulation(
-            title=regulation["title"],
-            content=regulation["content"]
-        )
-        
-        # 保存解读结果到数据库
-        db.save_regulation_analysis(regulation_id, analysis)
-        
-        return jsonify(analysis), 200
+        return enqueue_llm_job('analyze', regulation_id)
     
     except Exception as e:
         return jsonify({"error": f"分析法规失败: {str(e)}"}), 500
 
 @regulation_analysis_bp.route('/api/regulation/analyze/refresh/<int:regulation_id>', methods=['POST'])
 def refresh_analysis(regulation_id):
-    """刷新法规解读
+    """刷新法规解读，提交后台解读任务并返回202和任务ID
+    
+    法规正文、提示词和模型都未变化时命中LLM响应缓存，不会重新生成；
+    传入force=1时跳过缓存。
     
     Args:
         regulation_id: 法规ID
         
     Returns:
-        更新后的法规解读结果
+        202及任务ID
     """
     try:
         # 从数据库获取法规
@@ -63,17 +124,64 @@ def refresh_analysis(regulation_id):
         if not regulation:
             return jsonify({"error": "法规不存在"}), 404
         
-        # 调用LLM解读法规
-        analyzer = RegulationAnalyzer()
-        analysis = analyzer.analyze_regulation(
-            title=regulation["title"],
-            content=regulation["content"]
-        )
+        return enqueue_llm_job('analyze', regulation_id, force=request.args.get('force') == '1')
+    
+    except Exception as e:
+        return jsonify({"error": f"刷新法规解读失败: {str(e)}"}), 500
+
+@regulation_analysis_bp.route('/api/regulation/analysis/search', methods=['GET'])
+def search_by_analysis_item():
+    """按解读条目查询法规，例如适用对象包含“用人单位”的所有法规
+    
+    查询参数:
+        type: 条目类型（key_points、applicable_subjects、main_impacts、implementation_guide、related_regulations）
+        value: 条目内容
+        exact: 为1时完全匹配，默认按包含关系匹配
+        
+    Returns:
+        法规列表
+    """
+    try:
+        item_type = request.args.get('type', 'applicable_subjects')
+        value = request.args.get('value', '').strip()
+        exact = request.args.get('exact', '0') == '1'
+        limit = int(request.args.get('limit', 20))
+        offset = int(request.args.get('offset', 0))
+        
+        if not value:
+            return jsonify({"error": "缺少value参数"}), 400
+        
+        try:
+            regulations = db.find_regulations_by_analysis_item(
+                item_type, value, exact=exact, limit=limit, offset=offset
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return jsonify({"regulations": regulations, "limit": limit, "offset": offset}), 200
+    
+    except Exception as e:
+        return jsonify({"error": f"按解读条目查询失败: {str(e)}"}), 500
+
+@regulation_analysis_bp.route('/api/regulation/analysis/items/<item_type>', methods=['GET'])
+def get_analysis_item_counts(item_type):
+    """统计解读条目的出现次数，例如最常见的适用对象
+    
+    Args:
+        item_type: 条目类型
+        
+    Returns:
+        条目内容及对应的法规数
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
         
-        # 更新数据库中的解读结果
-        db.update_regulation_analysis(regulation_id, analysis)
+        try:
+            items = db.get_analysis_item_counts(item_type, limit=limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        return jsonify(analysis), 200
+        return jsonify({"items": items}), 200
     
     except Exception as e:
-        return jsonify({"error": f"刷新法规解读失败: {str(e)}"}), 500 
\ No newline at end of file
+        return jsonify({"error": f"统计解读条目失败: {str(e)}"}), 500
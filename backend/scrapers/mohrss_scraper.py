@@ -5,10 +5,21 @@ from datetime import datetime
 import os
 import sys
 import time
+from dotenv import load_dotenv
+
+# 加载环境变量（数据库存储选项等）
+load_dotenv()
 
 # 添加项目根目录到系统路径，使我们可以导入数据库模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from database.db_operations import DBOperations
+from database.db_operations import DBOperations, next_page_cursor
+from database.content_codec import compute_content_hash
+from backend.metrics import scraper_fetch_duration, scraper_pages_per_second
+
+# 累积多少条法规详情后批量写入一次数据库
+SAVE_BATCH_SIZE = 20
+# 更新现有法规时每次从数据库读取的条数（按游标翻页，遍历全部法规）
+UPDATE_PAGE_SIZE = 200
 
 class MohrssRegulationScraper:
     """人力资源和社会保障部法规爬虫"""
@@ -26,18 +37,59 @@ class MohrssRegulationScraper:
         }
         # 用于全局跟踪已处理URL，避免重复处理
         self.processed_urls = set()
+        # 成功抓取的页面数（列表页和详情页），用于统计抓取速度
+        self.fetched_pages = 0
     
     def get_page_content(self, url):
         """获取页面内容"""
+        start = time.perf_counter()
         try:
             response = requests.get(url, headers=self.headers, timeout=30)
             response.raise_for_status()
             response.encoding = 'utf-8'
+            scraper_fetch_duration.observe(time.perf_counter() - start, outcome='success')
+            self.fetched_pages += 1
             return response.text
         except Exception as e:
+            scraper_fetch_duration.observe(time.perf_counter() - start, outcome='error')
             print(f"获取页面内容失败: {url}, 错误: {e}")
             return None
     
+    def get_page_content_if_modified(self, url, validators=None):
+        """以条件请求获取页面，页面自上次抓取后未修改时服务器返回304，不传输正文
+        
+        Args:
+            url: 页面地址
+            validators: 上次抓取时的验证信息{'etag', 'last_modified'}，为None时发送普通请求
+            
+        Returns:
+            (页面内容, 本次的验证信息)；页面未修改时为(None, validators)，请求失败时为(None, None)
+        """
+        headers = dict(self.headers)
+        if validators and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                scraper_fetch_duration.observe(time.perf_counter() - start, outcome='not_modified')
+                return None, validators
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            scraper_fetch_duration.observe(time.perf_counter() - start, outcome='success')
+            self.fetched_pages += 1
+            return response.text, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+        except Exception as e:
+            scraper_fetch_duration.observe(time.perf_counter() - start, outcome='error')
+            print(f"获取页面内容失败: {url}, 错误: {e}")
+            return None, None
+    
     def normalize_url(self, url, base_list_url):
         """规范化URL
         
@@ -131,9 +183,14 @@ class MohrssRegulationScraper:
         print(f"从页面解析出 {len(regulations)} 条法规")
         return regulations
     
-    def parse_regulation_detail(self, url, regulation_meta):
-        """解析法规详情页面"""
-        html_content = self.get_page_content(url)
+    def parse_regulation_detail(self, url, regulation_meta, html_content=None):
+        """解析法规详情页面
+        
+        Args:
+            html_content: 已获取的页面内容，为None时抓取url
+        """
+        if html_content is None:
+            html_content = self.get_page_content(url)
         if not html_content:
             return None
         
@@ -318,22 +375,96 @@ class MohrssRegulationScraper:
         return pagination_links
     
     def load_existing_urls(self):
-        """从数据库中加载所有已存在的URL"""
-        # 获取所有法规记录
-        all_regulations = self.db.get_regulations(limit=1000)  # 设置一个较大的限制以获取所有记录
-        # 提取并存储所有URL
-        existing_urls = set()
-        for reg in all_regulations:
-            if 'url' in reg and reg['url']:
-                existing_urls.add(reg['url'].strip())
-        return existing_urls
+        """从数据库中加载所有已存在的URL，用于跳过已抓取过的详情页"""
+        return self.db.get_regulation_urls()
     
-    def scrape_regulations(self, pages=1):
-        """爬取法规信息"""
+    def save_pending_regulations(self, pending, existing_urls=None):
+        """批量保存已解析的法规详情
+        
+        批量写入失败时逐条重新保存，只有逐条保存也失败的法规会被放弃；
+        这些法规的URL从existing_urls和已处理集合中移除，后续遇到时会重新抓取。
+        
+        Args:
+            pending: 待保存的法规详情列表，保存后会被清空
+            existing_urls: 数据库中已存在的URL集合
+            
+        Returns:
+            实际保存（新增或更新）的条数
+        """
+        if not pending:
+            return 0
+        
+        try:
+            counts = self.db.save_regulations_batch(pending)
+            print(f"批量保存法规: 新增 {counts['inserted']} 条, 更新 {counts['updated']} 条")
+            return counts['inserted'] + counts['updated']
+        except Exception as e:
+            print(f"批量保存法规失败: {e}，改为逐条保存")
+            return self._save_regulations_one_by_one(pending, existing_urls)
+        finally:
+            pending.clear()
+    
+    def _save_regulations_one_by_one(self, details, existing_urls=None):
+        """逐条保存法规详情，保存失败的法规记录日志并允许重新抓取
+        
+        每条单独调用save_regulations_batch，URL已存在时同样更新原有记录。
+        
+        Returns:
+            实际保存（新增或更新）的条数
+        """
+        saved_count = 0
+        failed_urls = []
+        for detail in details:
+            try:
+                counts = self.db.save_regulations_batch([detail])
+                saved_count += counts['inserted'] + counts['updated']
+            except Exception as e:
+                print(f"保存法规失败: {detail['title']} - {detail['url']}, 错误: {e}")
+                failed_urls.append(detail['url'])
+                self.processed_urls.discard(detail['url'])
+                if existing_urls is not None:
+                    existing_urls.discard(detail['url'])
+        
+        print(f"逐条保存法规: 成功 {saved_count} 条, 失败 {len(failed_urls)} 条")
+        if failed_urls:
+            print("保存失败的法规URL:\n" + "\n".join(failed_urls))
+        return saved_count
+    
+    def scrape_regulations(self, pages=1, progress_callback=None):
+        """爬取法规信息
+        
+        Args:
+            pages: 每个列表地址爬取的页数
+            progress_callback: 进度回调 progress_callback(message=None, **counters)，
+                用于后台任务上报已爬取页数、已处理法规数等计数
+            
+        Returns:
+            保存（新增或更新）的法规条数
+        """
         saved_count = 0
+        pages_fetched = 0
+        processed_count = 0
+        found_count = 0
+        started = time.monotonic()
+        fetched_at_start = self.fetched_pages
+        
+        def report(message=None):
+            elapsed = time.monotonic() - started
+            if elapsed > 0:
+                scraper_pages_per_second.set((self.fetched_pages - fetched_at_start) / elapsed)
+            if progress_callback:
+                progress_callback(
+                    message=message,
+                    pages_fetched=pages_fetched,
+                    regulations_found=found_count,
+                    regulations_processed=processed_count,
+                    saved=saved_count
+                )
         
         # 预先加载所有已存在的URL，避免重复爬取
         existing_urls = self.load_existing_urls()
+        # 已解析、等待批量写入数据库的法规详情
+        pending = []
         print(f"数据库中已有 {len(existing_urls)} 条法规记录")
         
         # 遍历所有爬取地址
@@ -345,6 +476,7 @@ class MohrssRegulationScraper:
             if not html_content:
                 print(f"无法获取页面内容: {list_url}")
                 continue
+            pages_fetched += 1
             
             # 解析主页面的法规列表
             regulations = self.parse_regulation_list(html_content, list_url)
@@ -364,16 +496,21 @@ class MohrssRegulationScraper:
                     
                     page_html = self.get_page_content(page_url)
                     if page_html:
+                        pages_fetched += 1
                         page_regulations = self.parse_regulation_list(page_html, list_url)
                         regulations.extend(page_regulations)
+                        report(f"正在爬取列表第 {i} 页")
                     
                     # 页面之间的延迟
                     time.sleep(3)
             
             print(f"共找到 {len(regulations)} 条法规")
+            found_count += len(regulations)
+            report(f"开始处理 {list_url} 的法规详情")
             
             # 处理每条法规详情
             for reg in regulations:
+                processed_count += 1
                 try:
                     url = reg['url'].strip()
                     title = reg['title'].strip()
@@ -395,20 +532,14 @@ class MohrssRegulationScraper:
                     detail = self.parse_regulation_detail(url, reg)
                     
                     if detail:
-                        self.db.save_regulation(
-                            title=detail['title'],
-                            publish_date=detail['publish_date'],
-                            source=detail['source'],
-                            content=detail['content'],
-                            url=detail['url'],
-                            effective_date=detail.get('effective_date'),
-                            implementation_date=detail.get('implementation_date'),
-                            category=detail.get('category')
-                        )
+                        pending.append(detail)
                         # 添加到已存在URL集合，避免后续重复添加
                         existing_urls.add(url)
-                        saved_count += 1
-                        print(f"成功保存法规: {detail['title']}")
+                        print(f"成功解析法规: {detail['title']}")
+                        
+                        if len(pending) >= SAVE_BATCH_SIZE:
+                            saved_count += self.save_pending_regulations(pending, existing_urls)
+                        report()
                     
                     # 添加延迟以避免请求过于频繁
                     time.sleep(2)
@@ -416,81 +547,128 @@ class MohrssRegulationScraper:
                 except Exception as e:
                     print(f"处理法规时出错: {reg['title']}, 错误: {e}")
                     continue
+            
+            # 每个列表地址处理完后写入剩余的法规
+            saved_count += self.save_pending_regulations(pending, existing_urls)
+            report()
         
         return saved_count
 
     def update_existing_regulations(self):
-        """更新现有法规的元数据（特别是发文日期和施行日期）"""
-        # 获取所有法规记录
-        all_regulations = self.db.get_regulations(limit=1000)
-        total_count = len(all_regulations)
+        """更新现有法规的元数据（特别是发文日期和施行日期）及发生变化的正文
+        
+        按游标分页遍历数据库中的全部法规。详情页以条件请求抓取（If-None-Match /
+        If-Modified-Since，验证信息保存在regulation_fetch_state中），未修改的页面
+        服务器返回304，不下载也不解析正文。服务器不提供ETag和Last-Modified的页面
+        每次仍需完整下载；请求次数随法规总数线性增长，每次请求之间保留1秒间隔。
+        
+        正文通过content_hash比较，未变化的法规不做任何写入；正文变化会记入
+        regulation_changes，供重新解读等下游任务消费。
+        """
+        total_count = self.db.count_regulations()
         updated_count = 0
+        not_modified_count = 0
         
         print(f"开始更新 {total_count} 条法规记录的元数据")
         
-        for i, reg in enumerate(all_regulations, 1):
-            reg_id = reg['id']
-            title = reg['title']
-            url = reg.get('url', '')
-            
-            if not url:
-                print(f"跳过 ID={reg_id} - {title}：没有URL")
-                continue
-            
-            print(f"\n[{i}/{total_count}] 更新：{title}")
-            
-            # 创建metadata对象，用于传递给parse_regulation_detail
-            reg_meta = {
-                'title': title,
-                'url': url,
-                'publish_date': reg.get('publish_date', '')
-            }
-            
-            # 重新解析详情页
-            detail = self.parse_regulation_detail(url, reg_meta)
-            
-            if not detail:
-                print(f"跳过 ID={reg_id} - {title}：无法解析详情")
-                continue
-            
-            # 检查是否需要更新
-            need_update = False
-            update_fields = {}
-            
-            # 检查发布日期
-            if detail.get('publish_date') and detail['publish_date'] != reg.get('publish_date'):
-                update_fields['publish_date'] = detail['publish_date']
-                need_update = True
-                print(f"  - 发布日期：{reg.get('publish_date', '空')} -> {detail['publish_date']}")
-            
-            # 检查施行日期
-            if detail.get('implementation_date') and detail.get('implementation_date') != reg.get('implementation_date'):
-                update_fields['implementation_date'] = detail['implementation_date']
-                need_update = True
-                print(f"  - 施行日期：{reg.get('implementation_date', '空')} -> {detail['implementation_date']}")
-            
-            # 检查有效日期
-            if detail.get('effective_date') and detail.get('effective_date') != reg.get('effective_date'):
-                update_fields['effective_date'] = detail['effective_date']
-                need_update = True
-                print(f"  - 有效日期：{reg.get('effective_date', '空')} -> {detail['effective_date']}")
-            
-            # 如果需要更新，调用数据库更新操作
-            if need_update:
-                try:
-                    self.db.update_regulation(reg_id, update_fields)
+        i = 0
+        cursor = None
+        while True:
+            page = self.db.get_regulations(limit=UPDATE_PAGE_SIZE, cursor=cursor)
+            for reg in page:
+                i += 1
+                result = self._update_regulation(reg, i, total_count)
+                if result == 'updated':
                     updated_count += 1
-                    print(f"  ✅ 成功更新 ID={reg_id} - {title}")
-                except Exception as e:
-                    print(f"  ❌ 更新失败 ID={reg_id} - {title}：{e}")
-            else:
-                print(f"  ✓ 无需更新 ID={reg_id} - {title}")
+                elif result == 'not_modified':
+                    not_modified_count += 1
             
-            # 添加延迟以避免请求过于频繁
-            time.sleep(1)
+            cursor = next_page_cursor(page, UPDATE_PAGE_SIZE)
+            if not cursor:
+                break
         
-        print(f"\n更新完成！共更新 {updated_count}/{total_count} 条法规记录")
+        print(f"\n更新完成！共更新 {updated_count}/{total_count} 条法规记录，{not_modified_count} 条页面未修改")
         return updated_count
+    
+    def _update_regulation(self, reg, index, total_count):
+        """重新抓取一条法规的详情页并更新发生变化的字段
+        
+        Returns:
+            'updated'、'not_modified'（页面未修改）、'unchanged'或'skipped'
+        """
+        reg_id = reg['id']
+        title = reg['title']
+        url = reg.get('url', '')
+        
+        if not url:
+            print(f"跳过 ID={reg_id} - {title}：没有URL")
+            return 'skipped'
+        
+        print(f"\n[{index}/{total_count}] 更新：{title}")
+        
+        # 创建metadata对象，用于传递给parse_regulation_detail
+        reg_meta = {
+            'title': title,
+            'url': url,
+            'publish_date': reg.get('publish_date', '')
+        }
+        
+        html_content, validators = self.get_page_content_if_modified(url, self.db.get_fetch_validators(url))
+        # 添加延迟以避免请求过于频繁
+        time.sleep(1)
+        
+        if validators is not None and html_content is None:
+            print(f"  ✓ 页面未修改 ID={reg_id} - {title}")
+            return 'not_modified'
+        
+        # 重新解析详情页
+        detail = self.parse_regulation_detail(url, reg_meta, html_content=html_content) if html_content else None
+        
+        if not detail:
+            print(f"跳过 ID={reg_id} - {title}：无法解析详情")
+            return 'skipped'
+        
+        # 检查是否需要更新
+        update_fields = {}
+        
+        # 检查发布日期
+        if detail.get('publish_date') and detail['publish_date'] != reg.get('publish_date'):
+            update_fields['publish_date'] = detail['publish_date']
+            print(f"  - 发布日期：{reg.get('publish_date', '空')} -> {detail['publish_date']}")
+        
+        # 检查施行日期
+        if detail.get('implementation_date') and detail.get('implementation_date') != reg.get('implementation_date'):
+            update_fields['implementation_date'] = detail['implementation_date']
+            print(f"  - 施行日期：{reg.get('implementation_date', '空')} -> {detail['implementation_date']}")
+        
+        # 检查有效日期
+        if detail.get('effective_date') and detail.get('effective_date') != reg.get('effective_date'):
+            update_fields['effective_date'] = detail['effective_date']
+            print(f"  - 有效日期：{reg.get('effective_date', '空')} -> {detail['effective_date']}")
+        
+        # 检查正文是否变化
+        if detail.get('content') and compute_content_hash(detail['content']) != reg.get('content_hash'):
+            update_fields['content'] = detail['content']
+            print("  - 正文内容已变化")
+        
+        result = 'unchanged'
+        # 如果需要更新，调用数据库更新操作
+        if update_fields:
+            try:
+                self.db.update_regulation(reg_id, update_fields)
+                result = 'updated'
+                print(f"  ✅ 成功更新 ID={reg_id} - {title}")
+            except Exception as e:
+                # 不保存验证信息，下次仍完整抓取该页面
+                print(f"  ❌ 更新失败 ID={reg_id} - {title}：{e}")
+                return 'skipped'
+        else:
+            print(f"  ✓ 无需更新 ID={reg_id} - {title}")
+        
+        # 页面已处理完成，记录验证信息供下次发送条件请求
+        if validators.get('etag') or validators.get('last_modified'):
+            self.db.save_fetch_validators(url, validators['etag'], validators['last_modified'])
+        return result
 
 if __name__ == "__main__":
     # 运行爬虫
@@ -0,0 +1,139 @@
+"""批量预生成法规AI解读
+
+查找没有解读、解读已过期（正文在解读之后发生变化）或上次调用LLM失败的法规，并发调用LLM生成解读并保存，
+使用户首次打开法规时无需等待。每条解读生成后立即保存，中断后重新运行会从剩余的法规继续。
+
+用法（在项目根目录运行）:
+    python backend/scrapers/run_preanalysis.py [--concurrency 8] [--limit 100]
+
+解读与接口共用RegulationAnalyzer，长法规的分段调用、响应缓存和失败重试行为一致；
+--concurrency同时限制本进程内并发的LLM请求数。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+# 添加项目根目录到系统路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+class PreanalysisRun:
+    """一次批量解读的执行状态与统计"""
+
+    def __init__(self, db, analyzer, total, use_cache=True):
+        self.db = db
+        self.analyzer = analyzer
+        self.total = total
+        self.use_cache = use_cache
+        self.completed = 0
+        self.failed = []
+        self.content_chars = 0
+        self.started = time.monotonic()
+
+    def analyze(self, regulation_id):
+        """生成并保存一条法规的解读（在线程池中执行）
+
+        Returns:
+            (法规标题, 正文字数)
+        """
+        from backend.llm.regulation_analyzer import is_failed_analysis
+
+        regulation = self.db.get_regulation_by_id(regulation_id)
+        if not regulation:
+            raise ValueError("法规不存在")
+
+        analysis = self.analyzer.analyze_regulation(
+            title=regulation["title"],
+            content=regulation["content"],
+            use_cache=self.use_cache
+        )
+        if is_failed_analysis(analysis):
+            raise RuntimeError(analysis["raw_response"])
+
+        # 记录解读所依据的正文版本，正文再次变化时会被重新解读
+        self.db.update_regulation_analysis(regulation_id, analysis, content_hash=regulation["content_hash"])
+        return regulation["title"], len(regulation["content"] or "")
+
+    async def process(self, semaphore, regulation):
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                title, chars = await asyncio.to_thread(self.analyze, regulation["id"])
+            except Exception as e:
+                self.failed.append(regulation["id"])
+                self.report(f"失败 {regulation['id']} 《{regulation['title']}》: {str(e)}")
+                return
+            self.completed += 1
+            self.content_chars += chars
+            self.report(f"完成 {regulation['id']} 《{title}》 {chars}字 {time.monotonic() - start:.1f}s")
+
+    def report(self, message):
+        """输出一行进度"""
+        done = self.completed + len(self.failed)
+        elapsed = time.monotonic() - self.started
+        rate = self.completed / elapsed if elapsed > 0 else 0
+        remaining = (self.total - done) / rate if rate > 0 else 0
+        print(f"[{done}/{self.total}] {message}  ({rate * 60:.1f} 条/分钟, 预计剩余 {remaining / 60:.1f} 分钟)")
+
+    def summary(self):
+        """输出吞吐量报告"""
+        elapsed = time.monotonic() - self.started
+        print("\n=== 批量解读完成 ===")
+        print(f"成功: {self.completed}  失败: {len(self.failed)}  未处理: {self.total - self.completed - len(self.failed)}")
+        print(f"耗时: {elapsed:.1f}s")
+        if elapsed > 0:
+            print(f"吞吐量: {self.completed / elapsed * 60:.1f} 条/分钟, {self.content_chars / elapsed:.0f} 字/秒")
+        if self.failed:
+            print(f"失败的法规ID（重新运行时会再次尝试）: {', '.join(str(i) for i in self.failed)}")
+
+
+async def run(db, analyzer, regulations, concurrency, use_cache=True):
+    """以最多concurrency条并发解读法规"""
+    state = PreanalysisRun(db, analyzer, len(regulations), use_cache=use_cache)
+    # LLM调用为阻塞的requests请求，放在与并发数相同大小的线程池中执行
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        await asyncio.gather(*(state.process(semaphore, regulation) for regulation in regulations))
+    finally:
+        state.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量预生成法规AI解读')
+    parser.add_argument('--concurrency', type=int, default=4, help='并发的LLM请求数')
+    parser.add_argument('--limit', type=int, default=None, help='本次最多解读的法规数')
+    parser.add_argument('--no-cache', action='store_true', help='不使用LLM响应缓存，全部重新生成')
+    args = parser.parse_args()
+
+    # 读取.env中的LLM配置（已设置的环境变量优先）
+    load_dotenv()
+    # 限流参数在导入时读取：全局并发上限与--concurrency一致，批量任务排队等待不设超时
+    os.environ['LLM_MAX_CONCURRENCY'] = str(args.concurrency)
+    os.environ['LLM_QUEUE_MAX_WAIT'] = str(24 * 3600)
+
+    from database.db_operations import DBOperations
+    from backend.llm.regulation_analyzer import RegulationAnalyzer
+
+    db = DBOperations()
+    analyzer = RegulationAnalyzer()
+
+    regulations = db.get_regulations_needing_analysis(limit=args.limit)
+    if not regulations:
+        print("所有法规都已有最新的解读")
+        return
+
+    print(f"待解读法规 {len(regulations)} 条，并发数 {args.concurrency}")
+    try:
+        asyncio.run(run(db, analyzer, regulations, args.concurrency, use_cache=not args.no_cache))
+    except KeyboardInterrupt:
+        print("\n已中断，已完成的解读均已保存，重新运行将继续处理剩余法规")
+
+
+if __name__ == "__main__":
+    main()
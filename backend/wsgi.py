@@ -0,0 +1,17 @@
+"""生产环境WSGI入口
+
+Linux/macOS:
+    gunicorn -c gunicorn.conf.py backend.wsgi:app
+Windows:
+    waitress-serve --listen=0.0.0.0:5001 --threads=16 backend.wsgi:app
+
+需在项目根目录下运行（数据库路径database/legalguard.db相对于当前目录）。
+"""
+import os
+import sys
+
+# 添加项目根目录到系统路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.app import create_app
+
+app = create_app()
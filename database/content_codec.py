@@ -0,0 +1,80 @@
+"""法规正文压缩编解码与正文哈希
+
+压缩后的正文存放在regulation_content表中，codec字段记录所用算法，
+因此不同算法、压缩与未压缩的记录可以共存。安装了zstandard时默认使用zstd，
+否则使用标准库zlib。
+"""
+import hashlib
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+DEFAULT_CODEC = CODEC_ZSTD if zstandard else CODEC_ZLIB
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def compute_content_hash(text):
+    """计算法规正文的SHA-256哈希，用于判断正文是否变化"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress_text(text, codec=DEFAULT_CODEC):
+    """压缩文本
+
+    Args:
+        text: 原始文本
+        codec: 压缩算法，'zlib'或'zstd'
+
+    Returns:
+        压缩后的字节串
+    """
+    data = text.encode('utf-8')
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("使用zstd压缩需要安装zstandard")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"不支持的压缩算法: {codec}")
+
+
+def decompress_text(codec, data):
+    """解压文本
+
+    Args:
+        codec: 压缩算法
+        data: 压缩后的字节串
+
+    Returns:
+        原始文本
+    """
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("读取zstd压缩的内容需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    raise ValueError(f"不支持的压缩算法: {codec}")
+
+
+def _sql_decompress(codec, data):
+    """SQL函数lg_decompress(codec, data)，参数为NULL时返回NULL"""
+    if codec is None or data is None:
+        return None
+    return decompress_text(codec, data)
+
+
+def register_sqlite_functions(conn):
+    """在连接上注册解压函数
+
+    DBOperations读取压缩正文的查询（REGULATION_TEXT_SQL）使用lg_decompress；
+    数据库结构本身（触发器、视图）不依赖该函数，外部连接无需注册即可读写。
+    """
+    conn.create_function('lg_decompress', 2, _sql_decompress, deterministic=True)
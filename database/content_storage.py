@@ -0,0 +1,93 @@
+"""法规正文存储转换与报告工具
+
+用法:
+    python database/content_storage.py report      # 统计正文占用空间及读取耗时
+    python database/content_storage.py compress    # 将已有正文转换为压缩存储
+    python database/content_storage.py decompress  # 将压缩正文还原为普通存储
+
+新写入的法规是否压缩由LEGALGUARD_COMPRESS_CONTENT环境变量控制，
+本工具只转换已经存在的记录。
+"""
+import os
+import sys
+import time
+import argparse
+
+# 添加项目根目录到系统路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.db_operations import DBOperations
+
+
+def _timed(func, repeat):
+    """执行repeat次并返回平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def report(db, samples=50):
+    """输出正文存储空间与读取耗时报告"""
+    conn = db.get_connection()
+    
+    total, plain_count, plain_bytes = conn.execute(
+        "SELECT COUNT(*), SUM(content <> ''), COALESCE(SUM(length(CAST(content AS BLOB))), 0) FROM regulations"
+    ).fetchone()
+    compressed_count, original_bytes, stored_bytes = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length(data)), 0) FROM regulation_content"
+    ).fetchone()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    
+    print("=== 正文存储 ===")
+    print(f"法规总数: {total}")
+    print(f"未压缩: {plain_count or 0} 条, {plain_bytes / 1024:.1f} KB")
+    print(f"已压缩: {compressed_count} 条, 原始 {original_bytes / 1024:.1f} KB -> 存储 {stored_bytes / 1024:.1f} KB", end='')
+    if stored_bytes:
+        print(f" (压缩比 {original_bytes / stored_bytes:.2f})")
+    else:
+        print()
+    print(f"数据库文件: {page_size * page_count / 1024 / 1024:.2f} MB")
+    
+    ids = [row[0] for row in conn.execute("SELECT id FROM regulations ORDER BY RANDOM() LIMIT ?", (samples,))]
+    if not ids:
+        return
+    
+    print(f"\n=== 读取耗时（{len(ids)} 条样本）===")
+    detail_ms = _timed(lambda: [db.get_regulation_by_id(regulation_id) for regulation_id in ids], 3) / len(ids)
+    list_ms = _timed(lambda: db.get_regulations(limit=20), 20)
+    print(f"详情 get_regulation_by_id: {detail_ms:.3f} ms/条")
+    print(f"列表 get_regulations(limit=20): {list_ms:.3f} ms/次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="法规正文存储转换与报告工具")
+    parser.add_argument('command', choices=['report', 'compress', 'decompress'])
+    parser.add_argument('--db', default='database/legalguard.db', help="数据库文件路径")
+    parser.add_argument('--batch-size', type=int, default=500, help="每个事务转换的条数")
+    parser.add_argument('--samples', type=int, default=50, help="读取耗时测试的样本数")
+    args = parser.parse_args()
+    
+    db = DBOperations(args.db)
+    
+    if args.command == 'report':
+        report(db, args.samples)
+        return
+    
+    print("转换前:")
+    report(db, args.samples)
+    
+    start = time.perf_counter()
+    count = db.convert_content_storage(compress=args.command == 'compress', batch_size=args.batch_size)
+    print(f"\n共转换 {count} 条，耗时 {time.perf_counter() - start:.2f} 秒")
+    
+    if count:
+        # 回收转换后释放的页面
+        db.get_connection().execute("VACUUM")
+    
+    print("\n转换后:")
+    report(db, args.samples)
+
+
+if __name__ == "__main__":
+    main()
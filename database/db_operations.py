@@ -1,35 +1,255 @@
+import os
 import sqlite3
+import threading
+import time
+import base64
+import functools
+import inspect
+from collections import OrderedDict
 from datetime import datetime
 import json
 
+from database.migrations import migrate
+from database.content_codec import (
+    DEFAULT_CODEC, compress_text, compute_content_hash, decompress_text, register_sqlite_functions
+)
+
+# SQLite连接调优参数
+SQLITE_BUSY_TIMEOUT = 30                   # 等待写锁的秒数
+SQLITE_CACHE_SIZE_KB = 20000               # 每个连接的页缓存大小（约20MB）
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024       # 内存映射读取的上限（256MB）
+SQLITE_STATEMENT_CACHE = 256               # 每个连接缓存的预编译语句数量
+
+# trigram分词器只能匹配不少于3个字符的词，更短的词退回LIKE查询
+FTS_MIN_TERM_LENGTH = 3
+# bm25排序时标题与正文的权重
+FTS_TITLE_WEIGHT = 10.0
+FTS_CONTENT_WEIGHT = 1.0
+
+# 列表接口返回的字段，不包含体积较大的content，全文只在详情接口返回
+REGULATION_LIST_COLUMNS = (
+    'id', 'title', 'publish_date', 'effective_date', 'implementation_date',
+    'source', 'category', 'url', 'content_hash', 'created_at', 'updated_at'
+)
+
+# 搜索结果摘要：高亮标记与摘要长度
+SNIPPET_HIGHLIGHT_START = '<mark>'
+SNIPPET_HIGHLIGHT_END = '</mark>'
+SNIPPET_ELLIPSIS = '…'
+SNIPPET_TOKENS = 32          # FTS5 snippet()截取的词数（trigram下约等于字数）
+SNIPPET_LIKE_CONTEXT = 30    # LIKE匹配时命中位置前后截取的字数
+
+# 法规正文的SQL表达式：优先读取压缩存储的正文，未压缩时读取regulations.content
+REGULATION_TEXT_SQL = (
+    "COALESCE((SELECT lg_decompress(codec, data) FROM regulation_content "
+    "WHERE regulation_id = regulations.id), regulations.content)"
+)
+
+# 法规解读中逐项存入regulation_analysis_items、可按条目查询的列表字段
+ANALYSIS_ITEM_TYPES = (
+    'key_points', 'applicable_subjects', 'main_impacts', 'implementation_guide', 'related_regulations'
+)
+
+# 调用LLM API失败时解读结果的摘要和原始响应以此开头，这类解读视为需要重新生成
+API_ERROR_PREFIX = "API调用失败"
+
+# 批量保存法规时每个事务写入的条数
+REGULATION_BATCH_SIZE = 500
+
+# 批量获取法规详情时单次最多的ID数
+REGULATION_FETCH_MAX_IDS = 100
+
+# 流式导出时每次从游标读取的行数
+EXPORT_FETCH_SIZE = 200
+
+# 法规总数缓存：数据库有写入（包括其他进程的写入）时立即失效，TTL只用于限制缓存时长
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+def encode_cursor(publish_date, regulation_id):
+    """将分页位置(publish_date, id)编码为不透明的游标字符串"""
+    raw = json.dumps([publish_date, regulation_id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析分页游标
+    
+    Returns:
+        (publish_date, regulation_id)
+        
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        publish_date, regulation_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    if not isinstance(publish_date, str) or not isinstance(regulation_id, int):
+        raise ValueError("无效的分页游标")
+    return publish_date, regulation_id
+
+def next_page_cursor(rows, limit):
+    """根据本页结果生成下一页游标，已到最后一页时返回None"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last['publish_date'], last['id'])
+
 class DBOperations:
-    def __init__(self, db_path='database/legalguard.db'):
+    # 线程本地连接池：同一线程对同一数据库文件只保持一个连接，所有实例共享
+    _local = threading.local()
+    
+    # 已完成迁移检查的数据库 {db_path: 全文检索索引是否可用}
+    _schema_state = {}
+    _schema_lock = threading.Lock()
+    
+    # 数据库操作监听函数 listener(方法名, 耗时秒数, SQL语句数, 是否抛出异常)，用于性能指标统计
+    _operation_listeners = []
+    
+    # 按筛选条件缓存的法规总数 {(db_path, 筛选条件): (写入代数, 缓存时间, 总数)}
+    _count_cache = OrderedDict()
+    _count_cache_lock = threading.Lock()
+
+    def __init__(self, db_path='database/legalguard.db', compress_content=None):
+        """
+        Args:
+            db_path: 数据库文件路径
+            compress_content: 是否压缩存储新写入的法规正文，为None时读取
+                              LEGALGUARD_COMPRESS_CONTENT环境变量（默认不压缩）
+        """
         self.db_path = db_path
-        self._ensure_analysis_table_exists()
+        if compress_content is None:
+            compress_content = os.getenv('LEGALGUARD_COMPRESS_CONTENT', '').lower() in ('1', 'true', 'yes')
+        self.compress_content = compress_content
+        self.fts_enabled = self._ensure_schema()
 
-    def _ensure_analysis_table_exists(self):
-        """确保法规解读表存在"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _ensure_schema(self):
+        """确保数据库结构为最新版本
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS regulation_analysis (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                regulation_id INTEGER NOT NULL,
-                summary TEXT,
-                analysis_data TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (regulation_id) REFERENCES regulations (id)
-            )
-        ''')
+        每个进程对每个数据库文件只执行一次迁移检查，之后创建的实例直接复用检查结果。
         
-        conn.commit()
-        conn.close()
+        Returns:
+            全文检索索引是否可用
+        """
+        with self._schema_lock:
+            if self.db_path not in self._schema_state:
+                conn = self.get_connection()
+                migrate(conn)
+                cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'regulations_fts'")
+                self._schema_state[self.db_path] = cursor.fetchone() is not None
+                cursor.close()
+            return self._schema_state[self.db_path]
+
+    def _build_search_filter(self, search_term):
+        """构建搜索条件
+        
+        搜索词按空白拆分，各词之间为AND关系。长度足够的词走FTS5全文索引，
+        过短的词或全文索引不可用时使用LIKE匹配。
+        
+        Args:
+            search_term: 用户输入的搜索词
+            
+        Returns:
+            (是否使用全文索引, WHERE子句列表, 参数列表)
+        """
+        match_terms = []
+        where_clauses = []
+        params = []
+        
+        for term in search_term.split():
+            if self.fts_enabled and len(term) >= FTS_MIN_TERM_LENGTH:
+                # 以短语形式匹配，避免用户输入被解析为FTS5查询语法
+                match_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                where_clauses.append(f"(regulations.title LIKE ? OR {REGULATION_TEXT_SQL} LIKE ?)")
+                search_pattern = f"%{term}%"
+                params.extend([search_pattern, search_pattern])
+        
+        if match_terms:
+            where_clauses.insert(0, "regulations_fts MATCH ?")
+            params.insert(0, " ".join(match_terms))
+        
+        return bool(match_terms), where_clauses, params
+
+    def get_write_generation(self):
+        """获取当前写入代数，数值变化说明法规数据（法规、解读、AI解读）有过写入
+        
+        写入代数保存在data_generation表中，由这些表上的触发器在写入的同一事务中递增，
+        因此任何连接（gunicorn的其他worker、命令行爬虫等）的写入都能被感知；
+        任务状态、LLM响应缓存等其他表的写入不改变写入代数。
+        """
+        return self.get_connection().execute("SELECT generation FROM data_generation").fetchone()[0]
 
     def get_connection(self):
-        """获取数据库连接"""
-        return sqlite3.connect(self.db_path)
+        """获取当前线程复用的数据库连接
+
+        连接在首次使用时创建并按线程缓存，之后的调用直接复用，
+        避免每次查询都重新打开数据库文件。
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        
+        conn = connections.get(self.db_path)
+        if conn is None:
+            conn = self._open_connection()
+            connections[self.db_path] = conn
+        return conn
+
+    def _open_connection(self):
+        """打开并配置一个新的数据库连接"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=SQLITE_BUSY_TIMEOUT,
+            cached_statements=SQLITE_STATEMENT_CACHE
+        )
+        # WAL模式下读写互不阻塞，爬虫写入时查询仍可正常进行
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        register_sqlite_functions(conn)
+        return conn
+
+    def _enable_statement_tracing(self):
+        """为当前线程的连接安装语句跟踪回调，统计每个数据库操作执行的SQL语句数
+        
+        只在注册了操作监听函数时由_instrumented调用，未启用指标统计时连接不设跟踪回调。
+        """
+        traced_paths = getattr(self._local, 'traced_paths', None)
+        if traced_paths is None:
+            traced_paths = self._local.traced_paths = set()
+        if self.db_path not in traced_paths:
+            self.get_connection().set_trace_callback(_count_statement)
+            traced_paths.add(self.db_path)
+
+    @classmethod
+    def add_operation_listener(cls, listener):
+        """注册数据库操作监听函数
+        
+        每个公开方法执行完成后调用 listener(方法名, 耗时秒数, SQL语句数, 是否抛出异常)；
+        方法内部调用的其他公开方法不单独统计。
+        """
+        if listener not in cls._operation_listeners:
+            cls._operation_listeners.append(listener)
+
+    @classmethod
+    def reset_connections(cls):
+        """丢弃所有线程缓存的连接，用于fork出的子进程（SQLite连接不能跨进程使用）"""
+        cls._local = threading.local()
+
+    def close(self):
+        """关闭当前线程持有的数据库连接"""
+        connections = getattr(self._local, 'connections', None)
+        if connections:
+            conn = connections.pop(self.db_path, None)
+            if conn is not None:
+                conn.close()
+        traced_paths = getattr(self._local, 'traced_paths', None)
+        if traced_paths:
+            traced_paths.discard(self.db_path)
 
     def save_regulation(self, title, publish_date, source, content, url, effective_date=None, implementation_date=None, category=None):
         """保存法规信息到数据库
@@ -47,51 +267,441 @@ class DBOperations:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # 检查表中是否存在implementation_date字段
-        cursor.execute("PRAGMA table_info(regulations)")
-        columns = cursor.fetchall()
-        column_names = [column[1] for column in columns]
+        try:
+            cursor.execute(
+                """
+                INSERT INTO regulations (title, publish_date, effective_date, implementation_date, source, content, url, category, content_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (title, publish_date, effective_date, implementation_date, source,
+                 '' if self.compress_content else content, url, category, compute_content_hash(content))
+            )
+            regulation_id = cursor.lastrowid
+            if self.compress_content:
+                self._store_compressed_content(cursor, [(regulation_id, content)])
+            conn.commit()
+            return regulation_id
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+    def save_regulations_batch(self, details, batch_size=REGULATION_BATCH_SIZE):
+        """批量保存法规，URL已存在时更新原有记录
+        
+        每batch_size条在一个事务内用executemany写入，依赖regulations.url上的唯一索引
+        执行INSERT ... ON CONFLICT(url) DO UPDATE。正文哈希和各字段都没有变化的法规
+        不做任何写入，也不会出现在变更记录中。
+        
+        Args:
+            details: 法规详情字典的可迭代对象，字段与save_regulation的参数相同
+                     （即爬虫parse_regulation_detail的返回值）
+            batch_size: 每个事务写入的条数
+            
+        Returns:
+            {'inserted': 新增条数, 'updated': 更新条数, 'unchanged': 未变化条数}
+        """
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        batch = {}
+        
+        for detail in details:
+            # 同一批次内URL重复时以最后一条为准
+            batch[detail['url']] = detail
+            if len(batch) >= batch_size:
+                self._upsert_regulations(batch, counts)
+                batch = {}
+        
+        if batch:
+            self._upsert_regulations(batch, counts)
+        
+        return counts
+
+    def _upsert_regulations(self, batch, counts):
+        """在一个事务内写入一批法规，并累加新增/更新/未变化条数"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        urls = list(batch.keys())
+        content_hashes = {url: compute_content_hash(detail['content']) for url, detail in batch.items()}
+        rows = [
+            (
+                detail['title'],
+                detail['publish_date'],
+                detail.get('effective_date'),
+                detail.get('implementation_date'),
+                detail['source'],
+                '' if self.compress_content else detail['content'],
+                url,
+                detail.get('category'),
+                content_hashes[url]
+            )
+            for url, detail in batch.items()
+        ]
+        
+        try:
+            # 立即获取写锁，保证读取已有记录与写入之间不被其他进程修改
+            cursor.execute("BEGIN IMMEDIATE")
+            existing_hashes = {}
+            # 分段查询，避免超出SQLite的参数个数限制
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT url, content_hash FROM regulations WHERE url IN ({placeholders})", chunk)
+                existing_hashes.update(cursor.fetchall())
+            
+            # 正文未变化时保留原有正文（可能为压缩存储），只更新变化的字段
+            cursor.executemany(
+                """
+                INSERT INTO regulations (title, publish_date, effective_date, implementation_date, source, content, url, category, content_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    publish_date = excluded.publish_date,
+                    effective_date = excluded.effective_date,
+                    implementation_date = excluded.implementation_date,
+                    source = excluded.source,
+                    content = CASE WHEN content_hash IS excluded.content_hash THEN content ELSE excluded.content END,
+                    category = excluded.category,
+                    content_hash = excluded.content_hash,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE content_hash IS NOT excluded.content_hash
+                   OR title IS NOT excluded.title
+                   OR publish_date IS NOT excluded.publish_date
+                   OR effective_date IS NOT excluded.effective_date
+                   OR implementation_date IS NOT excluded.implementation_date
+                   OR source IS NOT excluded.source
+                   OR category IS NOT excluded.category
+                """,
+                rows
+            )
+            # rowcount为实际新增和更新的行数，被WHERE跳过的未变化法规不计入
+            written = cursor.rowcount
+            
+            # 只为新增或正文变化的法规写入正文：压缩存储时写入regulation_content，
+            # 否则删除旧的压缩正文，以regulations.content为准
+            changed_urls = [url for url in urls if existing_hashes.get(url) != content_hashes[url]]
+            if changed_urls:
+                regulation_ids = {}
+                for i in range(0, len(changed_urls), 500):
+                    chunk = changed_urls[i:i + 500]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(f"SELECT url, id FROM regulations WHERE url IN ({placeholders})", chunk)
+                    regulation_ids.update(cursor.fetchall())
+                if self.compress_content:
+                    self._store_compressed_content(
+                        cursor,
+                        [(regulation_ids[url], batch[url]['content']) for url in changed_urls]
+                    )
+                else:
+                    cursor.executemany(
+                        "DELETE FROM regulation_content WHERE regulation_id = ?",
+                        [(regulation_ids[url],) for url in changed_urls]
+                    )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        
+        inserted = len(rows) - len(existing_hashes)
+        counts['inserted'] += inserted
+        counts['updated'] += written - inserted
+        counts['unchanged'] += len(existing_hashes) - (written - inserted)
+
+    def _store_compressed_content(self, cursor, items):
+        """在当前事务中压缩并保存法规正文，并将原文写入全文检索索引
+        
+        压缩存储的法规在regulations.content中为空字符串，触发器无法取得正文，
+        因此由这里写入索引。
+        
+        Args:
+            cursor: 当前事务的游标
+            items: (法规ID, 正文)列表
+        """
+        cursor.executemany(
+            """
+            INSERT INTO regulation_content (regulation_id, codec, size, data)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(regulation_id) DO UPDATE SET
+                codec = excluded.codec,
+                size = excluded.size,
+                data = excluded.data
+            """,
+            [
+                (regulation_id, DEFAULT_CODEC, len(content.encode('utf-8')), compress_text(content))
+                for regulation_id, content in items
+            ]
+        )
+        if self.fts_enabled:
+            cursor.executemany(
+                "UPDATE regulations_fts SET content = ? WHERE rowid = ?",
+                [(content, regulation_id) for regulation_id, content in items]
+            )
+
+    def get_regulation_content(self, regulation_id):
+        """读取并解压法规正文
+        
+        Returns:
+            压缩存储的正文；该法规未压缩存储时返回None
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT codec, data FROM regulation_content WHERE regulation_id = ?", (regulation_id,))
+        record = cursor.fetchone()
+        cursor.close()
+        
+        if not record:
+            return None
+        return decompress_text(*record)
+
+    def _load_compressed_contents(self, regulations):
+        """为正文为空的法规补充解压后的正文（压缩存储的法规在regulations.content中为空字符串）"""
+        pending = {reg['id']: reg for reg in regulations if reg.get('content') == ''}
+        if not pending:
+            return
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        placeholders = ", ".join("?" * len(pending))
+        cursor.execute(
+            f"SELECT regulation_id, codec, data FROM regulation_content WHERE regulation_id IN ({placeholders})",
+            list(pending.keys())
+        )
+        for regulation_id, codec, data in cursor.fetchall():
+            pending[regulation_id]['content'] = decompress_text(codec, data)
+        cursor.close()
+
+    def convert_content_storage(self, compress=True, batch_size=REGULATION_BATCH_SIZE):
+        """将已有法规的正文批量转换为压缩存储或还原为普通存储
         
-        # 如果不存在implementation_date字段，添加它
-        if 'implementation_date' not in column_names:
+        Args:
+            compress: True压缩尚未压缩的正文，False解压已压缩的正文
+            batch_size: 每个事务转换的条数
+            
+        Returns:
+            转换的条数
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        converted = 0
+        last_id = 0
+        
+        while True:
+            if compress:
+                cursor.execute(
+                    """
+                    SELECT id, content FROM regulations
+                    WHERE id > ? AND content <> ''
+                    ORDER BY id LIMIT ?
+                    """,
+                    (last_id, batch_size)
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT regulation_id, codec, data FROM regulation_content
+                    WHERE regulation_id > ?
+                    ORDER BY regulation_id LIMIT ?
+                    """,
+                    (last_id, batch_size)
+                )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            
             try:
-                cursor.execute("ALTER TABLE regulations ADD COLUMN implementation_date TEXT")
+                if compress:
+                    self._store_compressed_content(cursor, rows)
+                    cursor.executemany("UPDATE regulations SET content = '' WHERE id = ?", [(row[0],) for row in rows])
+                else:
+                    cursor.executemany(
+                        "UPDATE regulations SET content = ? WHERE id = ?",
+                        [(decompress_text(codec, data), regulation_id) for regulation_id, codec, data in rows]
+                    )
+                    cursor.executemany("DELETE FROM regulation_content WHERE regulation_id = ?", [(row[0],) for row in rows])
                 conn.commit()
-                print("已添加implementation_date字段到regulations表")
             except Exception as e:
-                print(f"添加implementation_date字段失败: {e}")
                 conn.rollback()
+                raise e
+            
+            converted += len(rows)
+            print(f"已{'压缩' if compress else '解压'} {converted} 条法规正文")
+        
+        cursor.close()
+        return converted
+
+    def get_regulation_changes(self, since_id=0, limit=100):
+        """获取法规变更记录（新增及正文变化），供下游任务增量消费
+        
+        Args:
+            since_id: 上次处理到的变更记录ID，只返回其后的记录
+            limit: 返回条数
+            
+        Returns:
+            按ID升序排列的变更记录列表
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            """
+            SELECT c.id, c.regulation_id, c.change_type, c.content_hash, c.changed_at,
+                   r.title, r.url, r.publish_date
+            FROM regulation_changes c
+            LEFT JOIN regulations r ON r.id = c.regulation_id
+            WHERE c.id > ?
+            ORDER BY c.id
+            LIMIT ?
+            """,
+            (since_id, limit)
+        )
+        changes = cursor.fetchall()
+        
+        column_names = [col[0] for col in cursor.description]
+        result = [dict(zip(column_names, row)) for row in changes]
+        
+        cursor.close()
+        return result
+
+    def get_current_timestamp(self):
+        """获取数据库当前时间（UTC，与updated_at的格式一致），作为下次增量导出的起点"""
+        cursor = self.get_connection().execute("SELECT CURRENT_TIMESTAMP")
+        timestamp = cursor.fetchone()[0]
+        cursor.close()
+        return timestamp
+
+    def iter_regulations_for_export(self, since=None, include_content=True, include_analysis=False,
+                                    batch_size=EXPORT_FETCH_SIZE):
+        """逐条读取待导出的法规，供流式导出使用
+
+        使用独立的数据库连接和服务端游标分批读取，内存占用与法规总数无关；
+        整个导出在同一个读事务中完成，不受导出期间写入的影响。
+
+        Args:
+            since: 只导出updated_at不早于该时间的法规（格式同CURRENT_TIMESTAMP），
+                   附带解读时解读在该时间之后更新的法规也会导出
+            include_content: 是否包含正文
+            include_analysis: 是否附带解读结果（analysis字段，无解读时为None）
+            batch_size: 每次从游标读取的行数
+
+        Yields:
+            按ID升序排列的法规字典
+        """
+        select_columns = [f"regulations.{column}" for column in REGULATION_LIST_COLUMNS]
+        if include_content:
+            select_columns.append(f"{REGULATION_TEXT_SQL} AS content")
+        sql = f"SELECT {', '.join(select_columns)}"
+        if include_analysis:
+            sql += (", regulation_analysis.analysis_data AS analysis FROM regulations "
+                    "LEFT JOIN regulation_analysis ON regulation_analysis.regulation_id = regulations.id")
+        else:
+            sql += " FROM regulations"
+
+        params = []
+        if since:
+            if include_analysis:
+                sql += " WHERE regulations.updated_at >= ? OR regulation_analysis.updated_at >= ?"
+                params = [since, since]
+            else:
+                sql += " WHERE regulations.updated_at >= ?"
+                params = [since]
+        sql += " ORDER BY regulations.id"
+
+        # 生成器可能在其他线程中被消费，且会长时间占用游标，不使用线程复用的连接
+        conn = self._open_connection()
+        try:
+            cursor = conn.execute(sql, params)
+            column_names = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    regulation = dict(zip(column_names, row))
+                    if include_analysis and regulation['analysis'] is not None:
+                        try:
+                            regulation['analysis'] = json.loads(regulation['analysis'])
+                        except json.JSONDecodeError:
+                            regulation['analysis'] = None
+                    yield regulation
+            cursor.close()
+        finally:
+            conn.close()
+
+    def get_regulation_urls(self):
+        """获取数据库中所有法规的URL集合"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT url FROM regulations")
+        urls = {row[0].strip() for row in cursor.fetchall() if row[0]}
+        
+        cursor.close()
+        return urls
+
+    def get_fetch_validators(self, url):
+        """获取详情页上次抓取时的HTTP缓存验证信息
+        
+        Returns:
+            {'etag': ETag, 'last_modified': Last-Modified}，没有记录时返回None
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT etag, last_modified FROM regulation_fetch_state WHERE url = ?", (url,))
+        row = cursor.fetchone()
+        
+        cursor.close()
+        return {'etag': row[0], 'last_modified': row[1]} if row else None
+
+    def save_fetch_validators(self, url, etag, last_modified):
+        """保存详情页的HTTP缓存验证信息，已有记录时覆盖
+        
+        regulation_fetch_state没有写入代数触发器，保存不会使接口缓存失效。
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
         try:
             cursor.execute(
                 """
-                INSERT INTO regulations (title, publish_date, effective_date, implementation_date, source, content, url, category)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO regulation_fetch_state (url, etag, last_modified, checked_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    checked_at = CURRENT_TIMESTAMP
                 """,
-                (title, publish_date, effective_date, implementation_date, source, content, url, category)
+                (url, etag, last_modified)
             )
-            regulation_id = cursor.lastrowid
             conn.commit()
-            return regulation_id
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            cursor.close()
 
-    def get_regulations(self, limit=100, offset=0, search_term=None, start_date=None, end_date=None):
-        """获取法规列表，支持搜索和日期筛选"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _build_regulation_filter(self, search_term=None, start_date=None, end_date=None, cursor=None):
+        """构建法规列表和计数共用的FROM/WHERE子句
         
-        query = "SELECT * FROM regulations"
+        Args:
+            cursor: 分页游标，传入时只保留游标位置之后的法规
+        
+        Returns:
+            (FROM及WHERE子句, 参数列表, 是否使用全文索引)
+        """
+        from_clause = "FROM regulations"
         params = []
         where_clauses = []
+        use_fts = False
         
         if search_term:
-            where_clauses.append("(title LIKE ? OR content LIKE ?)")
-            search_pattern = f"%{search_term}%"
-            params.extend([search_pattern, search_pattern])
+            use_fts, search_clauses, search_params = self._build_search_filter(search_term)
+            where_clauses.extend(search_clauses)
+            params.extend(search_params)
+            if use_fts:
+                from_clause += " JOIN regulations_fts ON regulations_fts.rowid = regulations.id"
         
         if start_date:
             where_clauses.append("publish_date >= ?")
@@ -101,22 +711,144 @@ class DBOperations:
             where_clauses.append("publish_date <= ?")
             params.append(end_date)
         
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            where_clauses.append("(publish_date, regulations.id) < (?, ?)")
+            params.extend([cursor_date, cursor_id])
+        
         if where_clauses:
-            query += " WHERE " + " AND ".join(where_clauses)
+            from_clause += " WHERE " + " AND ".join(where_clauses)
         
-        query += " ORDER BY publish_date DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
+        return from_clause, params, use_fts
+
+    def get_regulations(self, limit=100, offset=0, search_term=None, start_date=None, end_date=None, cursor=None, sort=None, include_content=False):
+        """获取法规列表，支持搜索和日期筛选
         
-        cursor.execute(query, params)
-        regulations = cursor.fetchall()
+        默认只返回REGULATION_LIST_COLUMNS中的字段；有搜索词时每条结果附带snippet字段，
+        为正文中命中位置附近的摘要，命中词以<mark></mark>标记。
+        
+        传入cursor时使用键集分页：按(publish_date, id)倒序从游标位置之后继续读取，
+        忽略offset，翻到任意深度的代价都与第一页相同。idx_regulations_publish_date
+        索引隐含rowid，本身即按(publish_date, id)有序，无需额外的复合索引。
+        
+        Args:
+            cursor: 上一页返回的分页游标，见next_page_cursor
+            sort: 'relevance'按搜索相关度排序（有搜索词时的默认值），'date'按发布日期排序；
+                  游标分页只适用于按日期排序
+            include_content: 是否返回法规全文
+        """
+        # 只包含空白的搜索词视为没有搜索
+        search_term = (search_term or '').strip() or None
+        
+        conn = self.get_connection()
+        db_cursor = conn.cursor()
+        
+        from_clause, params, use_fts = self._build_regulation_filter(search_term, start_date, end_date, cursor)
+        
+        select_columns = [f"regulations.{column}" for column in REGULATION_LIST_COLUMNS]
+        if include_content:
+            select_columns.append("regulations.content")
+        
+        select_params = []
+        like_terms = []
+        if search_term and use_fts:
+            select_columns.append(
+                f"snippet(regulations_fts, 1, '{SNIPPET_HIGHLIGHT_START}', '{SNIPPET_HIGHLIGHT_END}', "
+                f"'{SNIPPET_ELLIPSIS}', {SNIPPET_TOKENS}) AS snippet"
+            )
+        elif search_term:
+            # 未使用全文索引时，截取第一个搜索词命中位置附近的正文
+            like_terms = search_term.split()
+            select_columns.append(
+                f"substr({REGULATION_TEXT_SQL}, max(instr({REGULATION_TEXT_SQL}, ?) - ?, 1), ?) AS snippet"
+            )
+            select_params.extend([
+                like_terms[0],
+                SNIPPET_LIKE_CONTEXT,
+                SNIPPET_LIKE_CONTEXT * 2 + len(like_terms[0])
+            ])
+        
+        query = "SELECT " + ", ".join(select_columns) + " " + from_clause
+        params = select_params + params
+        
+        if use_fts and not cursor and sort != 'date':
+            # 按相关度排序，标题命中的权重高于正文
+            query += f" ORDER BY bm25(regulations_fts, {FTS_TITLE_WEIGHT}, {FTS_CONTENT_WEIGHT}), publish_date DESC"
+        else:
+            query += " ORDER BY publish_date DESC, regulations.id DESC"
+        
+        if cursor:
+            query += " LIMIT ?"
+            params.append(limit)
+        else:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        
+        db_cursor.execute(query, params)
+        regulations = db_cursor.fetchall()
         
         # 将结果转换为字典列表
-        column_names = [col[0] for col in cursor.description]
+        column_names = [col[0] for col in db_cursor.description]
         result = [dict(zip(column_names, row)) for row in regulations]
         
-        conn.close()
+        for regulation in result:
+            if like_terms and regulation['snippet']:
+                regulation['snippet'] = self._highlight_terms(regulation['snippet'], like_terms)
+        
+        db_cursor.close()
+        
+        if include_content:
+            self._load_compressed_contents(result)
         return result
 
+    @staticmethod
+    def _highlight_terms(text, terms):
+        """在摘要文本中为搜索词加上高亮标记"""
+        for term in terms:
+            text = text.replace(term, f"{SNIPPET_HIGHLIGHT_START}{term}{SNIPPET_HIGHLIGHT_END}")
+        return text
+
+    def count_regulations(self, search_term=None, start_date=None, end_date=None):
+        """统计符合筛选条件的法规总数
+        
+        只执行COUNT查询，不读取法规内容；结果按筛选条件缓存，
+        数据库有新的写入或超过COUNT_CACHE_TTL秒后重新统计。
+        
+        Args:
+            search_term: 搜索词
+            start_date: 起始发布日期
+            end_date: 截止发布日期
+            
+        Returns:
+            法规总数
+        """
+        search_term = (search_term or '').strip() or None
+        cache_key = (self.db_path, search_term, start_date or None, end_date or None)
+        generation = self.get_write_generation()
+        now = time.monotonic()
+        
+        with self._count_cache_lock:
+            cached = self._count_cache.get(cache_key)
+            if cached and cached[0] == generation and now - cached[1] < COUNT_CACHE_TTL:
+                self._count_cache.move_to_end(cache_key)
+                return cached[2]
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        from_clause, params, _ = self._build_regulation_filter(search_term, start_date, end_date)
+        cursor.execute("SELECT COUNT(*) " + from_clause, params)
+        total = cursor.fetchone()[0]
+        cursor.close()
+        
+        with self._count_cache_lock:
+            self._count_cache[cache_key] = (generation, now, total)
+            self._count_cache.move_to_end(cache_key)
+            while len(self._count_cache) > COUNT_CACHE_MAX_ENTRIES:
+                self._count_cache.popitem(last=False)
+        
+        return total
+
     def get_regulation_by_id(self, regulation_id):
         """根据ID获取法规详情"""
         conn = self.get_connection()
@@ -131,15 +863,81 @@ class DBOperations:
         else:
             result = None
         
-        conn.close()
+        cursor.close()
+        
+        if result and result['content'] == '':
+            # 正文压缩存储，按需解压
+            result['content'] = self.get_regulation_content(regulation_id) or ''
         return result
 
+    def get_regulations_by_ids(self, regulation_ids, include_content=True, include_interpretations=True):
+        """按ID批量获取法规详情及其解读
+        
+        法规和解读各用一次IN查询取出，避免逐条调用get_regulation_by_id和get_interpretations。
+        
+        Args:
+            regulation_ids: 法规ID列表，最多REGULATION_FETCH_MAX_IDS个，重复ID只返回一次
+            include_content: 是否返回正文
+            include_interpretations: 是否附带解读列表（interpretations字段）
+            
+        Returns:
+            法规列表，按regulation_ids的顺序排列，不存在的ID不出现在结果中
+        """
+        ids = list(dict.fromkeys(regulation_ids))
+        if not ids:
+            return []
+        if len(ids) > REGULATION_FETCH_MAX_IDS:
+            raise ValueError(f"一次最多获取 {REGULATION_FETCH_MAX_IDS} 条法规")
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        placeholders = ", ".join("?" * len(ids))
+        
+        select_columns = [f"regulations.{column}" for column in REGULATION_LIST_COLUMNS]
+        if include_content:
+            select_columns.append(f"{REGULATION_TEXT_SQL} AS content")
+        cursor.execute(
+            f"SELECT {', '.join(select_columns)} FROM regulations WHERE regulations.id IN ({placeholders})",
+            ids
+        )
+        column_names = [col[0] for col in cursor.description]
+        regulations = {row[0]: dict(zip(column_names, row)) for row in cursor.fetchall()}
+        
+        if include_interpretations and regulations:
+            for regulation in regulations.values():
+                regulation['interpretations'] = []
+            
+            found_ids = list(regulations.keys())
+            cursor.execute(
+                f"""
+                SELECT * FROM interpretations
+                WHERE regulation_id IN ({", ".join("?" * len(found_ids))})
+                ORDER BY regulation_id, id
+                """,
+                found_ids
+            )
+            column_names = [col[0] for col in cursor.description]
+            for row in cursor.fetchall():
+                interpretation = dict(zip(column_names, row))
+                regulations[interpretation['regulation_id']]['interpretations'].append(interpretation)
+        
+        cursor.close()
+        return [regulations[regulation_id] for regulation_id in ids if regulation_id in regulations]
+
     def save_interpretation(self, regulation_id, interpretation):
-        """保存法规解读"""
+        """保存法规解读，与该法规已有解读内容相同时不重复保存，返回已有解读的ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
+            cursor.execute(
+                "SELECT id FROM interpretations WHERE regulation_id = ? AND interpretation = ? LIMIT 1",
+                (regulation_id, interpretation)
+            )
+            existing = cursor.fetchone()
+            if existing:
+                return existing[0]
+            
             cursor.execute(
                 """
                 INSERT INTO interpretations (regulation_id, interpretation)
@@ -153,8 +951,6 @@ class DBOperations:
         except Exception as e:
             conn.rollback()
             raise e
-        finally:
-            conn.close()
 
     def get_interpretations(self, regulation_id):
         """获取法规解读列表"""
@@ -167,37 +963,87 @@ class DBOperations:
         column_names = [col[0] for col in cursor.description]
         result = [dict(zip(column_names, row)) for row in interpretations]
         
-        conn.close()
+        cursor.close()
         return result
 
-    def get_regulations_timeline(self, limit=20):
-        """获取法规时间轴数据"""
+    def get_regulations_timeline(self, limit=20, cursor=None):
+        """获取法规时间轴数据
+        
+        Args:
+            limit: 返回条数
+            cursor: 上一页返回的分页游标，为None时从最新的法规开始
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
         
-        cursor.execute(
-            """
+        query = """
             SELECT id, title, publish_date, source, category
             FROM regulations
-            ORDER BY publish_date DESC
-            LIMIT ?
-            """,
-            (limit,)
-        )
-        regulations = cursor.fetchall()
+        """
+        params = []
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            query += " WHERE (publish_date, id) < (?, ?)"
+            params.extend([cursor_date, cursor_id])
+        query += " ORDER BY publish_date DESC, id DESC LIMIT ?"
+        params.append(limit)
         
-        column_names = [col[0] for col in cursor.description]
+        db_cursor.execute(query, params)
+        regulations = db_cursor.fetchall()
+        
+        column_names = [col[0] for col in db_cursor.description]
         result = [dict(zip(column_names, row)) for row in regulations]
         
-        conn.close()
+        db_cursor.close()
         return result
 
-    def save_regulation_analysis(self, regulation_id, analysis_data):
-        """保存法规解读结果
+    def get_facets(self):
+        """获取法规数量统计：按年、按月、按分类、按来源
+        
+        读取由触发器增量维护的regulation_facets汇总表，不扫描regulations。
+        
+        Returns:
+            {'total': 总数, 'year': [...], 'month': [...], 'category': [...], 'source': [...]}，
+            每项为{'value': 取值, 'count': 数量}；年月按时间升序，分类和来源按数量降序。
+            未填写的分类、来源和日期取值为None。
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT facet, value, count FROM regulation_facets")
+        rows = cursor.fetchall()
+        cursor.close()
+        
+        facets = {'month': [], 'category': [], 'source': []}
+        for facet, value, count in rows:
+            facets.setdefault(facet, []).append({'value': value or None, 'count': count})
+        
+        years = {}
+        for item in facets['month']:
+            year = item['value'][:4] if item['value'] else None
+            years[year] = years.get(year, 0) + item['count']
+        
+        def by_value(item):
+            return (item['value'] is None, item['value'] or '')
+        
+        return {
+            'total': sum(item['count'] for item in facets['source']),
+            'year': sorted(({'value': year, 'count': count} for year, count in years.items()), key=by_value),
+            'month': sorted(facets['month'], key=by_value),
+            'category': sorted(facets['category'], key=lambda item: -item['count']),
+            'source': sorted(facets['source'], key=lambda item: -item['count'])
+        }
+
+    def save_regulation_analysis(self, regulation_id, analysis_data, content_hash=None):
+        """保存法规解读结果，已有解读时覆盖
+        
+        完整结果以JSON存储，列表字段（ANALYSIS_ITEM_TYPES）同时逐项写入
+        regulation_analysis_items，供按条目查询。
         
         Args:
             regulation_id: 法规ID
             analysis_data: 解读结果字典
+            content_hash: 解读所依据的正文哈希，为None时取法规当前的正文哈希
             
         Returns:
             解读记录ID
@@ -214,56 +1060,178 @@ class DBOperations:
         try:
             cursor.execute(
                 """
-                INSERT INTO regulation_analysis (regulation_id, summary, analysis_data, created_at, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                INSERT INTO regulation_analysis (regulation_id, summary, analysis_data, content_hash, created_at, updated_at)
+                VALUES (?, ?, ?, COALESCE(?, (SELECT content_hash FROM regulations WHERE id = ?)),
+                        CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ON CONFLICT(regulation_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    analysis_data = excluded.analysis_data,
+                    content_hash = excluded.content_hash,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (regulation_id, summary, analysis_json, content_hash, regulation_id)
+            )
+            cursor.execute("SELECT id FROM regulation_analysis WHERE regulation_id = ?", (regulation_id,))
+            analysis_id = cursor.fetchone()[0]
+            
+            cursor.execute("DELETE FROM regulation_analysis_items WHERE regulation_id = ?", (regulation_id,))
+            cursor.executemany(
+                """
+                INSERT INTO regulation_analysis_items (regulation_id, item_type, position, value)
+                VALUES (?, ?, ?, ?)
                 """,
-                (regulation_id, summary, analysis_json)
+                [(regulation_id, item_type, position, value)
+                 for item_type, position, value in self._extract_analysis_items(analysis_data)]
             )
-            analysis_id = cursor.lastrowid
             conn.commit()
             return analysis_id
         except Exception as e:
             conn.rollback()
             raise e
-        finally:
-            conn.close()
     
-    def update_regulation_analysis(self, regulation_id, analysis_data):
-        """更新法规解读结果
+    def update_regulation_analysis(self, regulation_id, analysis_data, content_hash=None):
+        """更新法规解读结果，尚无解读时新增
         
         Args:
             regulation_id: 法规ID
             analysis_data: 新的解读结果字典
+            content_hash: 解读所依据的正文哈希，为None时取法规当前的正文哈希
             
         Returns:
             是否更新成功
         """
+        self.save_regulation_analysis(regulation_id, analysis_data, content_hash=content_hash)
+        return True
+
+    def get_regulations_needing_analysis(self, after_id=0, limit=None):
+        """获取没有解读、解读已过期（正文在解读之后发生变化）或解读来自失败的API调用的法规
+        
+        Args:
+            after_id: 只返回ID大于该值的法规
+            limit: 最多返回条数，None表示不限
+            
+        Returns:
+            按ID升序排列的法规列表（id、title、content_hash，不含正文）
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # 转换为JSON字符串存储
-        analysis_json = json.dumps(analysis_data, ensure_ascii=False)
+        cursor.execute(
+            """
+            SELECT r.id, r.title, r.content_hash
+            FROM regulations r
+            LEFT JOIN regulation_analysis a ON a.regulation_id = r.id
+            WHERE r.id > ? AND (
+                a.id IS NULL OR a.content_hash IS NOT r.content_hash OR a.summary LIKE ?
+            )
+            ORDER BY r.id
+            LIMIT ?
+            """,
+            (after_id, API_ERROR_PREFIX + '%', -1 if limit is None else limit)
+        )
+        regulations = cursor.fetchall()
         
-        # 提取摘要，方便查询
-        summary = analysis_data.get('summary', '')
+        column_names = [col[0] for col in cursor.description]
+        result = [dict(zip(column_names, row)) for row in regulations]
         
-        try:
-            cursor.execute(
-                """
-                UPDATE regulation_analysis
-                SET summary = ?, analysis_data = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE regulation_id = ?
-                """,
-                (summary, analysis_json, regulation_id)
-            )
-            success = cursor.rowcount > 0
-            conn.commit()
-            return success
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        cursor.close()
+        return result
+    
+    @staticmethod
+    def _extract_analysis_items(analysis_data):
+        """提取解读结果中的列表条目
+        
+        Returns:
+            (条目类型, 序号, 内容)列表
+        """
+        items = []
+        for item_type in ANALYSIS_ITEM_TYPES:
+            values = analysis_data.get(item_type)
+            if isinstance(values, list):
+                items.extend(
+                    (item_type, position, str(value))
+                    for position, value in enumerate(values)
+                    if value
+                )
+        return items
+    
+    def find_regulations_by_analysis_item(self, item_type, value, exact=False, limit=100, offset=0):
+        """查询解读结果中包含指定条目的法规，例如适用对象包含“用人单位”的所有法规
+        
+        Args:
+            item_type: 条目类型，取值见ANALYSIS_ITEM_TYPES
+            value: 条目内容
+            exact: True时完全匹配（走索引），False时按包含关系匹配
+            limit: 返回条数
+            offset: 偏移量
+            
+        Returns:
+            法规列表（REGULATION_LIST_COLUMNS字段），matched_items为命中的条目内容
+        """
+        if item_type not in ANALYSIS_ITEM_TYPES:
+            raise ValueError(f"不支持的解读条目类型: {item_type}")
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        value_clause = "i.value = ?" if exact else "i.value LIKE ?"
+        select_columns = ", ".join(f"r.{column}" for column in REGULATION_LIST_COLUMNS)
+        cursor.execute(
+            f"""
+            SELECT {select_columns}, json_group_array(i.value) AS matched_items
+            FROM regulation_analysis_items i
+            JOIN regulations r ON r.id = i.regulation_id
+            WHERE i.item_type = ? AND {value_clause}
+            GROUP BY r.id
+            ORDER BY r.publish_date DESC, r.id DESC
+            LIMIT ? OFFSET ?
+            """,
+            (item_type, value if exact else f"%{value}%", limit, offset)
+        )
+        regulations = cursor.fetchall()
+        
+        column_names = [col[0] for col in cursor.description]
+        result = [dict(zip(column_names, row)) for row in regulations]
+        for regulation in result:
+            regulation['matched_items'] = json.loads(regulation['matched_items'])
+        
+        cursor.close()
+        return result
+    
+    def get_analysis_item_counts(self, item_type, limit=50):
+        """统计解读条目出现在多少条法规中，按法规数降序，例如最常见的适用对象
+        
+        Args:
+            item_type: 条目类型，取值见ANALYSIS_ITEM_TYPES
+            limit: 返回条数
+            
+        Returns:
+            [{'value': 条目内容, 'regulation_count': 法规数}, ...]
+        """
+        if item_type not in ANALYSIS_ITEM_TYPES:
+            raise ValueError(f"不支持的解读条目类型: {item_type}")
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            """
+            SELECT value, COUNT(DISTINCT regulation_id) AS regulation_count
+            FROM regulation_analysis_items
+            WHERE item_type = ?
+            GROUP BY value
+            ORDER BY regulation_count DESC, value
+            LIMIT ?
+            """,
+            (item_type, limit)
+        )
+        counts = cursor.fetchall()
+        
+        column_names = [col[0] for col in cursor.description]
+        result = [dict(zip(column_names, row)) for row in counts]
+        
+        cursor.close()
+        return result
     
     def get_regulation_analysis(self, regulation_id):
         """获取法规解读结果
@@ -287,7 +1255,7 @@ class DBOperations:
         )
         
         record = cursor.fetchone()
-        conn.close()
+        cursor.close()
         
         if not record:
             return None
@@ -315,6 +1283,8 @@ class DBOperations:
     def update_regulation(self, regulation_id, update_fields):
         """更新法规记录的特定字段
         
+        更新content时会同时更新content_hash，正文哈希变化会记入变更记录。
+        
         Args:
             regulation_id: 法规ID
             update_fields: 需要更新的字段字典，如 {'publish_date': '2023-01-01'}
@@ -324,13 +1294,26 @@ class DBOperations:
         """
         if not update_fields:
             return False
-            
+        
+        update_fields = dict(update_fields)
+        content = update_fields.pop('content', None)
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
+            if content is not None:
+                update_fields['content_hash'] = compute_content_hash(content)
+                # 正文按当前存储方式写入：压缩存储时写入regulation_content，否则清除旧的压缩正文
+                if self.compress_content:
+                    self._store_compressed_content(cursor, [(regulation_id, content)])
+                    update_fields['content'] = ''
+                else:
+                    cursor.execute("DELETE FROM regulation_content WHERE regulation_id = ?", (regulation_id,))
+                    update_fields['content'] = content
+            
             # 构建SET子句和参数
-            set_clause = ", ".join([f"{key} = ?" for key in update_fields.keys()])
+            set_clause = ", ".join([f"{key} = ?" for key in update_fields.keys()] + ["updated_at = CURRENT_TIMESTAMP"])
             params = list(update_fields.values())
             params.append(regulation_id)  # WHERE条件参数
             
@@ -350,5 +1333,214 @@ class DBOperations:
         except Exception as e:
             conn.rollback()
             raise e
+ 
+
+    def create_job(self, job_type, params=None, worker_pid=None):
+        """创建后台任务记录
+        
+        Args:
+            job_type: 任务类型，如'crawl'
+            params: 任务参数字典
+            worker_pid: 执行任务的进程ID
+            
+        Returns:
+            任务ID
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                """
+                INSERT INTO jobs (job_type, status, params, worker_pid)
+                VALUES (?, 'queued', ?, ?)
+                """,
+                (job_type, json.dumps(params or {}, ensure_ascii=False, sort_keys=True), worker_pid)
+            )
+            job_id = cursor.lastrowid
+            conn.commit()
+            return job_id
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+    def update_job(self, job_id, update_fields):
+        """更新后台任务记录
+        
+        任务状态不影响法规数据，jobs表没有写入代数触发器，更新任务不会使接口缓存失效。
+        
+        Args:
+            job_id: 任务ID
+            update_fields: 需要更新的字段字典；progress和result会序列化为JSON，
+                           started_at/finished_at传入True时记为当前时间
+        """
+        fields = dict(update_fields)
+        for key in ('progress', 'result'):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key], ensure_ascii=False)
+        
+        assignments = []
+        params = []
+        for key, value in fields.items():
+            if key in ('started_at', 'finished_at') and value is True:
+                assignments.append(f"{key} = CURRENT_TIMESTAMP")
+            else:
+                assignments.append(f"{key} = ?")
+                params.append(value)
+        params.append(job_id)
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", params)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+
+    def get_job(self, job_id):
+        """获取后台任务记录，params/progress/result解析为字典"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        record = cursor.fetchone()
+        
+        if record:
+            column_names = [col[0] for col in cursor.description]
+            result = dict(zip(column_names, record))
+            for key in ('params', 'progress', 'result'):
+                if result[key]:
+                    result[key] = json.loads(result[key])
+        else:
+            result = None
+        
+        cursor.close()
+        return result
+
+    def find_active_job(self, job_type, params=None):
+        """查找排队中或运行中的同类任务
+        
+        Args:
+            job_type: 任务类型
+            params: 传入时只匹配参数相同的任务
+            
+        Returns:
+            最早的一条任务记录ID，没有时返回None
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT id FROM jobs WHERE job_type = ? AND status IN ('queued', 'running')"
+        query_params = [job_type]
+        if params is not None:
+            query += " AND params = ?"
+            query_params.append(json.dumps(params, ensure_ascii=False, sort_keys=True))
+        cursor.execute(query + " ORDER BY id LIMIT 1", query_params)
+        record = cursor.fetchone()
+        
+        cursor.close()
+        return record[0] if record else None
+
+    def get_unfinished_jobs(self):
+        """获取所有排队中或运行中的任务（ID、类型、进程ID）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT id, job_type, worker_pid FROM jobs WHERE status IN ('queued', 'running')")
+        jobs = cursor.fetchall()
+        
+        column_names = [col[0] for col in cursor.description]
+        result = [dict(zip(column_names, row)) for row in jobs]
+        
+        cursor.close()
+        return result
+
+    def get_llm_cache_entry(self, cache_key):
+        """获取缓存的LLM响应，没有时返回None"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT response FROM llm_response_cache WHERE cache_key = ?", (cache_key,))
+        record = cursor.fetchone()
+        
+        cursor.close()
+        return record[0] if record else None
+
+    def save_llm_cache_entry(self, cache_key, model, response):
+        """保存LLM响应到缓存表，相同键已存在时覆盖
+        
+        缓存只在LLM调用层面使用，不影响接口返回的数据，该表没有写入代数触发器。
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                """
+                INSERT INTO llm_response_cache (cache_key, model, response, created_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    model = excluded.model,
+                    response = excluded.response,
+                    created_at = CURRENT_TIMESTAMP
+                """,
+                (cache_key, model, response)
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
         finally:
-            conn.close() 
\ No newline at end of file
+            cursor.close()
+
+
+# 当前线程正在执行的数据库操作：嵌套深度与已执行的SQL语句数
+_operation_state = threading.local()
+
+# 不计入操作统计的公开方法（连接管理等）
+_UNINSTRUMENTED_METHODS = {'get_connection', 'close', 'get_write_generation'}
+
+
+def _count_statement(statement):
+    """SQLite语句跟踪回调，累加当前线程的语句数"""
+    _operation_state.statements = getattr(_operation_state, 'statements', 0) + 1
+
+
+def _instrumented(operation, func):
+    """包装DBOperations方法，执行完成后通知操作监听函数"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        listeners = DBOperations._operation_listeners
+        if not listeners or getattr(_operation_state, 'depth', 0):
+            return func(self, *args, **kwargs)
+        
+        self._enable_statement_tracing()
+        _operation_state.depth = 1
+        _operation_state.statements = 0
+        failed = False
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            _operation_state.depth = 0
+            for listener in listeners:
+                listener(operation, duration, _operation_state.statements, failed)
+    return wrapper
+
+
+def _instrument_operations(cls):
+    """为所有公开的实例方法加上操作统计（生成器方法只能统计创建耗时，跳过）"""
+    for name, attr in list(vars(cls).items()):
+        if (name.startswith('_') or name in _UNINSTRUMENTED_METHODS
+                or not inspect.isfunction(attr) or inspect.isgeneratorfunction(attr)):
+            continue
+        setattr(cls, name, _instrumented(name, attr))
+
+
+_instrument_operations(DBOperations)
@@ -1,5 +1,10 @@
 import sqlite3
 import os
+import sys
+
+# 添加项目根目录到系统路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.migrations import migrate, get_schema_version
 
 def init_db():
     """初始化数据库结构"""
@@ -8,16 +13,12 @@ def init_db():
     
     # 连接到SQLite数据库（如果不存在则创建）
     conn = sqlite3.connect('database/legalguard.db')
-    cursor = conn.cursor()
     
-    # 读取并执行SQL脚本
-    with open('database/schema.sql', 'r') as f:
-        schema_sql = f.read()
-        cursor.executescript(schema_sql)
+    # 执行schema.sql及尚未应用的编号迁移
+    migrate(conn)
     
-    conn.commit()
+    print(f"数据库初始化完成（结构版本 {get_schema_version(conn)}）")
     conn.close()
-    print("数据库初始化完成")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db() 
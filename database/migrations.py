@@ -0,0 +1,609 @@
+"""数据库结构迁移
+
+以 PRAGMA user_version 记录数据库当前的结构版本：版本1为 schema.sql 中的基础结构，
+之后每个编号迁移按顺序执行且只执行一次。
+
+新增表、字段或索引时，请在 MIGRATIONS 末尾追加新的迁移，不要修改已经发布的迁移。
+"""
+import os
+import json
+import sqlite3
+
+from database.content_codec import compute_content_hash, decompress_text, register_sqlite_functions
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+
+def execute_sql_script(conn, sql):
+    """在当前事务中逐条执行SQL脚本
+
+    sqlite3的executescript会先提交当前事务，无法用于需要原子执行的迁移，
+    因此这里按完整语句拆分后逐条执行（可正确处理包含分号的触发器定义）。
+    """
+    statement = ''
+    for line in sql.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ''
+    if statement.strip():
+        conn.execute(statement)
+
+
+def _column_names(conn, table):
+    """获取表的字段名列表"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _apply_base_schema(conn):
+    """基础结构：regulations、interpretations表及索引"""
+    with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+        execute_sql_script(conn, f.read())
+
+
+def _add_implementation_date(conn):
+    """regulations表增加施行日期字段"""
+    # 旧版本在保存法规时可能已经添加过该字段
+    if 'implementation_date' not in _column_names(conn, 'regulations'):
+        conn.execute("ALTER TABLE regulations ADD COLUMN implementation_date TEXT")
+
+
+def _create_regulation_analysis(conn):
+    """法规AI解读结果表"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS regulation_analysis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            regulation_id INTEGER NOT NULL,
+            summary TEXT,
+            analysis_data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (regulation_id) REFERENCES regulations (id)
+        )
+    ''')
+
+
+def _create_search_index(conn):
+    """法规全文检索索引（FTS5 trigram分词）
+
+    SQLite不支持FTS5或trigram分词器时跳过，搜索退回LIKE查询。
+    """
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS regulations_fts USING fts5(
+                title,
+                content,
+                content='regulations',
+                content_rowid='id',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"当前SQLite不支持全文检索索引，搜索将使用LIKE查询: {e}")
+        return
+
+    execute_sql_script(conn, '''
+        CREATE TRIGGER IF NOT EXISTS regulations_fts_insert AFTER INSERT ON regulations BEGIN
+            INSERT INTO regulations_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS regulations_fts_delete AFTER DELETE ON regulations BEGIN
+            INSERT INTO regulations_fts (regulations_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS regulations_fts_update AFTER UPDATE OF title, content ON regulations BEGIN
+            INSERT INTO regulations_fts (regulations_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO regulations_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+    ''')
+    # 为已有法规建立索引
+    conn.execute("INSERT INTO regulations_fts (regulations_fts) VALUES ('rebuild')")
+
+
+def _unique_regulation_url(conn):
+    """regulations.url唯一索引，支持按URL批量upsert
+
+    建立索引前合并重复抓取的法规：保留每个URL最新（ID最大）的记录，其正文与最近一次抓取一致；
+    解读改挂到保留的记录上，被删除记录的AI解读针对的是旧正文，一并删除。
+    """
+    duplicates = conn.execute('''
+        SELECT r.id, keep.id
+        FROM regulations r
+        JOIN (SELECT url, MAX(id) AS id FROM regulations GROUP BY url HAVING COUNT(*) > 1) keep
+          ON keep.url = r.url
+        WHERE r.id <> keep.id
+    ''').fetchall()
+
+    for duplicate_id, keep_id in duplicates:
+        conn.execute("UPDATE interpretations SET regulation_id = ? WHERE regulation_id = ?", (keep_id, duplicate_id))
+        conn.execute("DELETE FROM regulation_analysis WHERE regulation_id = ?", (duplicate_id,))
+        conn.execute("DELETE FROM regulations WHERE id = ?", (duplicate_id,))
+
+    if duplicates:
+        print(f"已合并 {len(duplicates)} 条URL重复的法规")
+
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_regulations_url ON regulations(url)")
+
+
+# 全文检索触发器（迁移6至13）：修改前从索引中删除regulation_texts视图的当前内容，修改后再写入新内容，
+# 使索引始终与视图一致，无论正文存放在regulations.content还是压缩后的regulation_content中。
+# 视图依赖lg_decompress，迁移14已将其替换为_STANDALONE_SEARCH_INDEX_TRIGGERS
+_SEARCH_INDEX_DELETE = '''
+    INSERT INTO regulations_fts (regulations_fts, rowid, title, content)
+    SELECT 'delete', id, title, content FROM regulation_texts WHERE id = {row_id};
+'''
+_SEARCH_INDEX_INSERT = '''
+    INSERT INTO regulations_fts (rowid, title, content)
+    SELECT id, title, content FROM regulation_texts WHERE id = {row_id};
+'''
+_SEARCH_INDEX_TRIGGERS = [
+    # (触发器名, 触发时机, 索引操作, 行ID表达式)
+    ('regulations_fts_insert', 'AFTER INSERT ON regulations', _SEARCH_INDEX_INSERT, 'new.id'),
+    ('regulations_fts_delete', 'BEFORE DELETE ON regulations', _SEARCH_INDEX_DELETE, 'old.id'),
+    ('regulations_fts_before_update', 'BEFORE UPDATE OF title, content ON regulations', _SEARCH_INDEX_DELETE, 'old.id'),
+    ('regulations_fts_after_update', 'AFTER UPDATE OF title, content ON regulations', _SEARCH_INDEX_INSERT, 'new.id'),
+    ('regulation_content_fts_before_insert', 'BEFORE INSERT ON regulation_content', _SEARCH_INDEX_DELETE, 'new.regulation_id'),
+    ('regulation_content_fts_after_insert', 'AFTER INSERT ON regulation_content', _SEARCH_INDEX_INSERT, 'new.regulation_id'),
+    ('regulation_content_fts_before_update', 'BEFORE UPDATE ON regulation_content', _SEARCH_INDEX_DELETE, 'old.regulation_id'),
+    ('regulation_content_fts_after_update', 'AFTER UPDATE ON regulation_content', _SEARCH_INDEX_INSERT, 'new.regulation_id'),
+    ('regulation_content_fts_before_delete', 'BEFORE DELETE ON regulation_content', _SEARCH_INDEX_DELETE, 'old.regulation_id'),
+    ('regulation_content_fts_after_delete', 'AFTER DELETE ON regulation_content', _SEARCH_INDEX_INSERT, 'old.regulation_id'),
+]
+
+
+def _create_regulation_content(conn):
+    """压缩正文存储表regulation_content及regulation_texts视图
+
+    全文检索索引改为以regulation_texts视图为内容表，使压缩存储的正文同样可以被检索。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS regulation_content (
+            regulation_id INTEGER PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            FOREIGN KEY (regulation_id) REFERENCES regulations (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS regulation_texts AS
+        SELECT r.id, r.title, COALESCE(lg_decompress(c.codec, c.data), r.content) AS content
+        FROM regulations r
+        LEFT JOIN regulation_content c ON c.regulation_id = r.id
+    ''')
+
+    has_search_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'regulations_fts'"
+    ).fetchone()
+    if not has_search_index:
+        return
+
+    for trigger in ('regulations_fts_insert', 'regulations_fts_delete', 'regulations_fts_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE regulations_fts")
+    conn.execute('''
+        CREATE VIRTUAL TABLE regulations_fts USING fts5(
+            title,
+            content,
+            content='regulation_texts',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    ''')
+    for name, timing, action, row_id in _SEARCH_INDEX_TRIGGERS:
+        execute_sql_script(conn, f"""
+            CREATE TRIGGER {name} {timing} BEGIN
+                {action.format(row_id=row_id)}
+            END;
+        """)
+    conn.execute("INSERT INTO regulations_fts (regulations_fts) VALUES ('rebuild')")
+
+
+def _add_content_hash(conn):
+    """正文哈希、更新时间字段及法规变更记录表
+
+    regulation_changes按自增ID记录新增和正文变化的法规，
+    下游任务（重新解读、通知等）记住上次处理到的ID即可增量消费。
+    """
+    columns = _column_names(conn, 'regulations')
+    if 'content_hash' not in columns:
+        conn.execute("ALTER TABLE regulations ADD COLUMN content_hash TEXT")
+    if 'updated_at' not in columns:
+        conn.execute("ALTER TABLE regulations ADD COLUMN updated_at TIMESTAMP")
+    conn.execute("UPDATE regulations SET updated_at = created_at WHERE updated_at IS NULL")
+
+    rows = conn.execute("SELECT id, content FROM regulation_texts").fetchall()
+    conn.executemany(
+        "UPDATE regulations SET content_hash = ? WHERE id = ?",
+        [(compute_content_hash(content), regulation_id) for regulation_id, content in rows]
+    )
+
+    execute_sql_script(conn, '''
+        CREATE TABLE IF NOT EXISTS regulation_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            regulation_id INTEGER NOT NULL,
+            change_type TEXT NOT NULL,
+            content_hash TEXT,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_regulation_changes_regulation_id ON regulation_changes(regulation_id);
+        CREATE TRIGGER IF NOT EXISTS regulation_changes_insert AFTER INSERT ON regulations BEGIN
+            INSERT INTO regulation_changes (regulation_id, change_type, content_hash)
+            VALUES (new.id, 'created', new.content_hash);
+        END;
+        CREATE TRIGGER IF NOT EXISTS regulation_changes_update AFTER UPDATE OF content_hash ON regulations
+        WHEN old.content_hash IS NOT new.content_hash BEGIN
+            INSERT INTO regulation_changes (regulation_id, change_type, content_hash)
+            VALUES (new.id, 'updated', new.content_hash);
+        END;
+    ''')
+
+
+def _structure_regulation_analysis(conn):
+    """regulation_analysis按法规ID唯一，列表字段拆分到regulation_analysis_items
+
+    每条法规只保留最近更新的一条解读；解读中的列表字段（关键要点、适用对象等）
+    逐项写入子表并建立索引，可以直接按条目查询而无需解析每条解读的JSON。
+    """
+    conn.execute('''
+        DELETE FROM regulation_analysis
+        WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY regulation_id ORDER BY updated_at DESC, id DESC
+                ) AS row_number
+                FROM regulation_analysis
+            )
+            WHERE row_number = 1
+        )
+    ''')
+    execute_sql_script(conn, '''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_regulation_analysis_regulation_id ON regulation_analysis(regulation_id);
+        CREATE TABLE IF NOT EXISTS regulation_analysis_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            regulation_id INTEGER NOT NULL,
+            item_type TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            FOREIGN KEY (regulation_id) REFERENCES regulations (id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_regulation_analysis_items_type_value ON regulation_analysis_items(item_type, value);
+        CREATE INDEX IF NOT EXISTS idx_regulation_analysis_items_regulation_id ON regulation_analysis_items(regulation_id);
+    ''')
+
+    item_types = ('key_points', 'applicable_subjects', 'main_impacts', 'implementation_guide', 'related_regulations')
+    items = []
+    for regulation_id, analysis_json in conn.execute("SELECT regulation_id, analysis_data FROM regulation_analysis"):
+        try:
+            analysis_data = json.loads(analysis_json)
+        except (TypeError, json.JSONDecodeError):
+            continue
+        if not isinstance(analysis_data, dict):
+            continue
+        for item_type in item_types:
+            values = analysis_data.get(item_type)
+            if isinstance(values, list):
+                items.extend(
+                    (regulation_id, item_type, position, str(value))
+                    for position, value in enumerate(values)
+                    if value
+                )
+    conn.executemany(
+        "INSERT INTO regulation_analysis_items (regulation_id, item_type, position, value) VALUES (?, ?, ?, ?)",
+        items
+    )
+
+
+def _create_jobs(conn):
+    """后台任务表，记录爬虫等耗时任务的状态与进度"""
+    execute_sql_script(conn, '''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_type TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            params TEXT,
+            progress TEXT,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            worker_pid INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_type_status ON jobs(job_type, status);
+    ''')
+
+
+# 统计维度及取值表达式，{row}替换为new或old
+_FACET_EXPRESSIONS = {
+    'month': "substr(COALESCE({row}.publish_date, ''), 1, 7)",
+    'category': "COALESCE({row}.category, '')",
+    'source': "COALESCE({row}.source, '')",
+}
+
+
+def _facet_increment_sql(row):
+    """生成将{row}所在各统计项加1的触发器语句"""
+    return '\n'.join(
+        f"""INSERT INTO regulation_facets (facet, value, count) VALUES ('{facet}', {expression.format(row=row)}, 1)
+            ON CONFLICT(facet, value) DO UPDATE SET count = count + 1;"""
+        for facet, expression in _FACET_EXPRESSIONS.items()
+    )
+
+
+def _facet_decrement_sql(row):
+    """生成将{row}所在各统计项减1、并删除计数归零项的触发器语句"""
+    statements = []
+    for facet, expression in _FACET_EXPRESSIONS.items():
+        condition = f"facet = '{facet}' AND value = {expression.format(row=row)}"
+        statements.append(f"UPDATE regulation_facets SET count = count - 1 WHERE {condition};")
+        statements.append(f"DELETE FROM regulation_facets WHERE {condition} AND count <= 0;")
+    return '\n'.join(statements)
+
+
+def _create_regulation_facets(conn):
+    """按月份、分类、来源统计法规数量的汇总表
+    
+    由触发器随regulations的增删改增量维护（save_regulation、批量upsert和update_regulation
+    都会经过这些触发器），统计接口直接读取汇总表，无需扫描regulations。
+    """
+    facet_columns = "publish_date, category, source"
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in facet_columns.split(", "))
+    execute_sql_script(conn, f'''
+        CREATE TABLE IF NOT EXISTS regulation_facets (
+            facet TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (facet, value)
+        ) WITHOUT ROWID;
+        
+        CREATE TRIGGER IF NOT EXISTS regulation_facets_insert AFTER INSERT ON regulations BEGIN
+            {_facet_increment_sql('new')}
+        END;
+        CREATE TRIGGER IF NOT EXISTS regulation_facets_update AFTER UPDATE OF {facet_columns} ON regulations
+        WHEN {changed} BEGIN
+            {_facet_decrement_sql('old')}
+            {_facet_increment_sql('new')}
+        END;
+        CREATE TRIGGER IF NOT EXISTS regulation_facets_delete AFTER DELETE ON regulations BEGIN
+            {_facet_decrement_sql('old')}
+        END;
+    ''')
+    
+    # 根据现有数据重建统计
+    conn.execute("DELETE FROM regulation_facets")
+    for facet, expression in _FACET_EXPRESSIONS.items():
+        value = expression.format(row='regulations')
+        conn.execute(f"""
+            INSERT INTO regulation_facets (facet, value, count)
+            SELECT '{facet}', {value}, COUNT(*) FROM regulations GROUP BY {value}
+        """)
+
+
+def _index_updated_at(conn):
+    """为增量导出按更新时间筛选建立索引"""
+    execute_sql_script(conn, '''
+        CREATE INDEX IF NOT EXISTS idx_regulations_updated_at ON regulations(updated_at);
+        CREATE INDEX IF NOT EXISTS idx_regulation_analysis_updated_at ON regulation_analysis(updated_at);
+    ''')
+
+
+def _create_llm_response_cache(conn):
+    """LLM响应缓存表，以请求内容的哈希为键"""
+    execute_sql_script(conn, '''
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def _add_analysis_content_hash(conn):
+    """记录解读所依据的正文哈希，正文变化后可识别出过期的解读
+
+    已有解读视为基于当前正文生成。
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(regulation_analysis)")}
+    if 'content_hash' not in columns:
+        conn.execute("ALTER TABLE regulation_analysis ADD COLUMN content_hash TEXT")
+    conn.execute("""
+        UPDATE regulation_analysis
+        SET content_hash = (SELECT content_hash FROM regulations WHERE regulations.id = regulation_analysis.regulation_id)
+        WHERE content_hash IS NULL
+    """)
+
+
+# 全文检索触发器（迁移14起）：索引自行保存标题和正文，只读取regulations的字段，
+# 不依赖应用注册的SQL函数，sqlite3命令行等外部连接同样可以写入法规。
+# 压缩存储的法规在regulations.content中为空字符串，其正文由DBOperations在写入
+# regulation_content的同一事务中写入索引，触发器只同步标题。
+_STANDALONE_SEARCH_INDEX_TRIGGERS = '''
+    CREATE TRIGGER regulations_fts_insert AFTER INSERT ON regulations BEGIN
+        INSERT INTO regulations_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END;
+    CREATE TRIGGER regulations_fts_delete AFTER DELETE ON regulations BEGIN
+        DELETE FROM regulations_fts WHERE rowid = old.id;
+    END;
+    CREATE TRIGGER regulations_fts_update AFTER UPDATE OF title, content ON regulations
+    WHEN new.content <> '' BEGIN
+        DELETE FROM regulations_fts WHERE rowid = old.id;
+        INSERT INTO regulations_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END;
+    CREATE TRIGGER regulations_fts_update_title AFTER UPDATE OF title, content ON regulations
+    WHEN new.content = '' AND old.title IS NOT new.title BEGIN
+        UPDATE regulations_fts SET title = new.title WHERE rowid = new.id;
+    END;
+'''
+
+
+def _standalone_search_index(conn):
+    """全文检索索引改为自行保存内容，数据库结构不再依赖lg_decompress
+
+    迁移6以regulation_texts视图为索引的外部内容表，视图和触发器调用只在应用连接上
+    注册的lg_decompress，导致其他连接写入regulations时报错。这里删除该视图和相关触发器，
+    重建为保存标题和正文的普通FTS5表，压缩存储的正文在Python中解压后写入。
+    """
+    for name, _, _, _ in _SEARCH_INDEX_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("DROP VIEW IF EXISTS regulation_texts")
+
+    has_search_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'regulations_fts'"
+    ).fetchone()
+    if not has_search_index:
+        return
+
+    conn.execute("DROP TABLE regulations_fts")
+    conn.execute('''
+        CREATE VIRTUAL TABLE regulations_fts USING fts5(
+            title,
+            content,
+            tokenize='trigram'
+        )
+    ''')
+    execute_sql_script(conn, _STANDALONE_SEARCH_INDEX_TRIGGERS)
+
+    # 为已有法规建立索引，压缩存储的正文逐条解压后写入
+    conn.execute("INSERT INTO regulations_fts (rowid, title, content) SELECT id, title, content FROM regulations")
+    rows = conn.execute('''
+        SELECT c.regulation_id, c.codec, c.data
+        FROM regulation_content c
+        JOIN regulations r ON r.id = c.regulation_id
+        WHERE r.content = ''
+    ''').fetchall()
+    conn.executemany(
+        "UPDATE regulations_fts SET content = ? WHERE rowid = ?",
+        [(decompress_text(codec, data), regulation_id) for regulation_id, codec, data in rows]
+    )
+
+
+
+def _index_interpretation_regulation_id(conn):
+    """为按法规查询解读（详情、批量获取、保存前检查）建立索引"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_interpretations_regulation_id ON interpretations(regulation_id)")
+
+
+def _delete_failed_interpretations(conn):
+    """删除此前被当作解读保存的LLM错误信息
+
+    前缀与backend.llm_integration.INTERPRETATION_ERROR_PREFIXES一致。
+    """
+    deleted = conn.execute(
+        "DELETE FROM interpretations WHERE interpretation LIKE '错误：%' OR interpretation LIKE '生成解读时出错%'"
+    ).rowcount
+    if deleted:
+        print(f"已删除 {deleted} 条保存为解读的错误信息")
+
+
+# 写入后需要使接口缓存失效的表
+_GENERATION_TABLES = ('regulations', 'interpretations', 'regulation_analysis')
+
+
+def _create_data_generation(conn):
+    """写入代数表：法规、解读、AI解读的任何写入都在同一事务中由触发器递增
+
+    供接口响应缓存和总数缓存判断是否失效，所有进程读取的是同一个值；
+    jobs、llm_response_cache等表的写入不影响接口数据，不递增写入代数。
+    """
+    execute_sql_script(conn, '''
+        CREATE TABLE IF NOT EXISTS data_generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO data_generation (id, generation) VALUES (1, 0);
+    ''')
+    for table in _GENERATION_TABLES:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            execute_sql_script(conn, f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_generation_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE data_generation SET generation = generation + 1 WHERE id = 1;
+                END;
+            """)
+
+
+
+def _create_regulation_fetch_state(conn):
+    """详情页的HTTP缓存验证信息（ETag、Last-Modified），更新法规时发送条件请求
+
+    单独建表而不是放在regulations中，记录验证信息不会改变写入代数、使接口缓存失效。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS regulation_fetch_state (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+
+# (版本号, 说明, 迁移函数)，版本号必须连续递增
+MIGRATIONS = [
+    (1, '基础结构', _apply_base_schema),
+    (2, '施行日期字段', _add_implementation_date),
+    (3, '法规解读表', _create_regulation_analysis),
+    (4, '全文检索索引', _create_search_index),
+    (5, '法规URL唯一索引', _unique_regulation_url),
+    (6, '压缩正文存储', _create_regulation_content),
+    (7, '正文哈希与变更记录', _add_content_hash),
+    (8, '法规解读结构化存储', _structure_regulation_analysis),
+    (9, '后台任务表', _create_jobs),
+    (10, '法规统计汇总表', _create_regulation_facets),
+    (11, '更新时间索引', _index_updated_at),
+    (12, 'LLM响应缓存表', _create_llm_response_cache),
+    (13, '解读正文哈希', _add_analysis_content_hash),
+    (14, '全文检索索引独立存储', _standalone_search_index),
+    (15, '解读法规ID索引', _index_interpretation_regulation_id),
+    (16, '删除错误的解读记录', _delete_failed_interpretations),
+    (17, '数据写入代数', _create_data_generation),
+    (18, '详情页条件请求信息', _create_regulation_fetch_state),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """读取数据库当前的结构版本"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """将数据库升级到最新结构版本
+
+    每个迁移在独立的写事务中执行，并在同一事务内更新user_version；
+    多个进程同时启动时，后获得写锁的进程会重新读取版本号并跳过已完成的迁移。
+
+    Args:
+        conn: sqlite3数据库连接
+
+    Returns:
+        本次执行的迁移数量
+    """
+    register_sqlite_functions(conn)
+    current_version = get_schema_version(conn)
+    if current_version >= LATEST_VERSION:
+        return 0
+
+    applied = 0
+    for version, description, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied += 1
+        print(f"已应用数据库迁移 {version}: {description}")
+
+    return applied
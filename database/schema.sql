@@ -19,4 +19,5 @@ CREATE TABLE IF NOT EXISTS interpretations (
 );
 
 CREATE INDEX IF NOT EXISTS idx_regulations_publish_date ON regulations(publish_date);
-CREATE INDEX IF NOT EXISTS idx_regulations_title ON regulations(title); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_regulations_title ON regulations(title); 
+CREATE INDEX IF NOT EXISTS idx_interpretations_regulation_id ON interpretations(regulation_id);
\ No newline at end of file
@@ -1,26 +1,44 @@
 import React, { useState } from 'react';
 import { Typography, Card, Button, InputNumber, Form, message, Alert, Spin, Divider, Space } from 'antd';
 import { CloudDownloadOutlined, RobotOutlined, DatabaseOutlined } from '@ant-design/icons';
-import { runCrawler } from '../services/api';
+import { runCrawler, waitForJob } from '../services/api';
 
 const { Title, Paragraph } = Typography;
 
 const AdminPage = () => {
   const [loading, setLoading] = useState(false);
   const [result, setResult] = useState(null);
+  const [progress, setProgress] = useState(null);
   const [form] = Form.useForm();
 
+  const formatProgress = (job) => {
+    const counters = job.progress || {};
+    const parts = [];
+    if (counters.pages_fetched !== undefined) parts.push(`已爬取 ${counters.pages_fetched} 页`);
+    if (counters.regulations_found !== undefined) {
+      parts.push(`已处理 ${counters.regulations_processed || 0}/${counters.regulations_found} 条法规`);
+    }
+    if (counters.saved !== undefined) parts.push(`已保存 ${counters.saved} 条`);
+    return [job.message, parts.join('，')].filter(Boolean).join(' - ');
+  };
+
   const handleRunCrawler = async (values) => {
     try {
       setLoading(true);
       setResult(null);
+      setProgress(null);
       
-      message.info('正在启动爬虫任务，请稍候...');
       const data = await runCrawler(values.pages);
+      message.info(data.message);
+      
+      // 爬虫在后台执行，轮询任务进度直到结束
+      const job = await waitForJob(data.job_id, {
+        onProgress: (current) => setProgress(formatProgress(current))
+      });
       
       setResult({
         success: true,
-        message: data.message
+        message: job.message || `成功爬取 ${job.result?.saved || 0} 条法规`
       });
       
       message.success('爬虫任务完成');
@@ -28,11 +46,12 @@ const AdminPage = () => {
       console.error('运行爬虫失败:', error);
       setResult({
         success: false,
-        message: error.response?.data?.error || '运行爬虫失败，请检查后端服务是否正常运行'
+        message: error.response?.data?.error || error.message || '运行爬虫失败，请检查后端服务是否正常运行'
       });
       message.error('爬虫任务失败');
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -84,7 +103,7 @@ const AdminPage = () => {
         
         {loading && (
           <div style={{ marginTop: 16, textAlign: 'center' }}>
-            <Spin tip="正在爬取数据，请耐心等待..." />
+            <Spin tip={progress || "正在爬取数据，请耐心等待..."} />
           </div>
         )}
         
@@ -135,7 +154,7 @@ const AdminPage = () => {
           <strong>数据库文件路径:</strong> database/legalguard.db
         </Paragraph>
         <Paragraph>
-          <strong>数据表:</strong> regulations, interpretations
+          <strong>数据表:</strong> regulations, interpretations, jobs
         </Paragraph>
       </Card>
     </div>
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Typography, Card, Row, Col, Statistic, List, Spin, Button } from 'antd';
 import { FileTextOutlined, ClockCircleOutlined, ReadOutlined } from '@ant-design/icons';
 import { Link } from 'react-router-dom';
-import { getRegulations, getRegulationsTimeline } from '../services/api';
+import { getRegulations, getFacets } from '../services/api';
 
 const { Title, Paragraph } = Typography;
 
@@ -23,29 +23,17 @@ const HomePage = () => {
         const regulationsData = await getRegulations({ limit: 5 });
         setRecentRegulations(regulationsData.regulations || []);
         
-        // 计算统计数据
-        const allRegulationsData = await getRegulations({ limit: 1000 });
-        const allRegulations = allRegulationsData.regulations || [];
-        
-        // 计算本月和本年的法规数量
+        // 统计数据直接读取按年/月汇总的计数
+        const facets = await getFacets();
         const now = new Date();
-        const thisMonth = now.getMonth() + 1;
-        const thisYear = now.getFullYear();
-        
-        const thisMonthCount = allRegulations.filter(reg => {
-          const date = new Date(reg.publish_date);
-          return date.getMonth() + 1 === thisMonth && date.getFullYear() === thisYear;
-        }).length;
-        
-        const thisYearCount = allRegulations.filter(reg => {
-          const date = new Date(reg.publish_date);
-          return date.getFullYear() === thisYear;
-        }).length;
+        const thisYear = String(now.getFullYear());
+        const thisMonth = `${thisYear}-${String(now.getMonth() + 1).padStart(2, '0')}`;
+        const countOf = (items, value) => (items.find(item => item.value === value) || {}).count || 0;
         
         setStats({
-          totalRegulations: allRegulations.length,
-          thisMonth: thisMonthCount,
-          thisYear: thisYearCount
+          totalRegulations: facets.total || 0,
+          thisMonth: countOf(facets.month || [], thisMonth),
+          thisYear: countOf(facets.year || [], thisYear)
         });
       } catch (error) {
         console.error('获取首页数据失败:', error);
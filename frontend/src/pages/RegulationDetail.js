@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { 
   Typography, 
@@ -20,7 +20,7 @@ import {
   BuildOutlined,
   BulbOutlined
 } from '@ant-design/icons';
-import { getRegulationDetail, interpretRegulation } from '../services/api';
+import { getRegulationDetail, streamRegulationInterpretation } from '../services/api';
 import RegulationAnalysis from '../components/RegulationAnalysis';
 
 const { Title, Paragraph } = Typography;
@@ -33,6 +33,11 @@ const RegulationDetail = () => {
   const [interpreting, setInterpreting] = useState(false);
   const [regulation, setRegulation] = useState(null);
   const [interpretations, setInterpretations] = useState([]);
+  const [streamingText, setStreamingText] = useState('');
+  const closeStreamRef = useRef(null);
+
+  // 离开页面时关闭未完成的解读流
+  useEffect(() => () => closeStreamRef.current && closeStreamRef.current(), []);
 
   useEffect(() => {
     const fetchRegulationDetail = async () => {
@@ -52,30 +57,36 @@ const RegulationDetail = () => {
     fetchRegulationDetail();
   }, [id]);
 
-  const handleInterpret = async () => {
-    try {
-      setInterpreting(true);
-      message.info('正在生成法规解读，请稍候...');
-      
-      const data = await interpretRegulation(id);
-      
-      // 添加新的解读到列表
-      setInterpretations(prev => [
-        ...prev,
-        {
-          id: data.interpretation_id,
-          interpretation: data.interpretation,
-          created_at: new Date().toISOString()
-        }
-      ]);
-      
-      message.success('法规解读生成成功');
-    } catch (error) {
-      console.error('生成法规解读失败:', error);
-      message.error('生成法规解读失败');
-    } finally {
-      setInterpreting(false);
-    }
+  const handleInterpret = () => {
+    setInterpreting(true);
+    setStreamingText('');
+    
+    // 逐段显示模型输出，生成完成后加入解读列表
+    let text = '';
+    closeStreamRef.current = streamRegulationInterpretation(id, {
+      onDelta: (delta) => {
+        text += delta;
+        setStreamingText(text);
+      },
+      onDone: (data) => {
+        setInterpretations(prev => [
+          ...prev,
+          {
+            id: data.interpretation_id,
+            interpretation: text,
+            created_at: new Date().toISOString()
+          }
+        ]);
+        setStreamingText('');
+        setInterpreting(false);
+        message.success('法规解读生成成功');
+      },
+      onError: () => {
+        setStreamingText('');
+        setInterpreting(false);
+        message.error('生成法规解读失败');
+      }
+    });
   };
 
   if (loading) {
@@ -173,7 +184,12 @@ const RegulationDetail = () => {
           key="3"
         >
           <Card>
-            {interpretations.length === 0 ? (
+            {streamingText && (
+              <div className="interpretation-content" style={{ marginBottom: 16 }}>
+                {streamingText}
+              </div>
+            )}
+            {interpretations.length === 0 && !streamingText ? (
               <div style={{ textAlign: 'center', padding: 20 }}>
                 <Paragraph>暂无传统解读，点击下方按钮生成</Paragraph>
                 <Button 
@@ -5,9 +5,17 @@ import { Link } from 'react-router-dom';
 import { getRegulations } from '../services/api';
 import dayjs from 'dayjs';
 
-const { Title } = Typography;
+const { Title, Text } = Typography;
 const { RangePicker } = DatePicker;
 
+// 将后端返回的摘要按<mark>标记拆分为高亮片段，避免直接插入HTML
+const renderSnippet = (snippet) => {
+  const parts = snippet.split(/<mark>|<\/mark>/);
+  return parts.map((part, index) => (
+    index % 2 === 1 ? <mark key={index}>{part}</mark> : <React.Fragment key={index}>{part}</React.Fragment>
+  ));
+};
+
 const RegulationsList = () => {
   const [loading, setLoading] = useState(false);
   const [regulations, setRegulations] = useState([]);
@@ -27,7 +35,14 @@ const RegulationsList = () => {
       dataIndex: 'title',
       key: 'title',
       render: (text, record) => (
-        <Link to={`/legalguard/regulations/${record.id}`}>{text}</Link>
+        <div>
+          <Link to={`/legalguard/regulations/${record.id}`}>{text}</Link>
+          {record.snippet && (
+            <div>
+              <Text type="secondary">{renderSnippet(record.snippet)}</Text>
+            </div>
+          )}
+        </div>
       ),
       width: '40%'
     },
@@ -32,22 +32,72 @@ export const getRegulationDetail = async (id) => {
   }
 };
 
+// 后台任务接口返回202时轮询任务，返回任务结果；否则直接返回响应数据
+const resolveJobResponse = async (response) => {
+  if (response.status === 202) {
+    const job = await waitForJob(response.data.job_id);
+    return job.result;
+  }
+  return response.data;
+};
+
 // 获取法规解读（旧版）
 export const interpretRegulation = async (id) => {
   try {
     const response = await api.post(`/regulations/${id}/interpret`);
-    return response.data;
+    return await resolveJobResponse(response);
   } catch (error) {
     console.error('获取法规解读失败:', error);
     throw error;
   }
 };
 
+// 批量获取法规详情（含解读），一次最多100条
+export const getRegulationsBatch = async (ids, includeContent = true) => {
+  try {
+    const params = { ids: ids.join(','), include_content: includeContent ? 1 : 0 };
+    const response = await api.get('/regulations/batch', { params });
+    return response.data;
+  } catch (error) {
+    console.error('批量获取法规详情失败:', error);
+    throw error;
+  }
+};
+
+// 流式获取法规解读（Server-Sent Events），返回用于中止的close函数
+export const streamRegulationInterpretation = (id, { onDelta, onDone, onError, onProgress } = {}) => {
+  const source = new EventSource(`${API_BASE_URL}/regulations/${id}/interpret/stream`);
+  
+  // 长法规在开始生成前先分段提炼要点，期间推送progress事件
+  source.addEventListener('progress', (event) => {
+    if (onProgress) onProgress(JSON.parse(event.data).message);
+  });
+  
+  source.addEventListener('delta', (event) => {
+    if (onDelta) onDelta(JSON.parse(event.data).text);
+  });
+  
+  source.addEventListener('done', (event) => {
+    source.close();
+    if (onDone) onDone(JSON.parse(event.data));
+  });
+  
+  source.addEventListener('error', (event) => {
+    // 服务端推送的error事件带有data；连接中断时没有data，EventSource会自动重连，这里直接关闭
+    source.close();
+    const error = event.data ? JSON.parse(event.data).error : '连接中断';
+    console.error('流式获取法规解读失败:', error);
+    if (onError) onError(error);
+  });
+  
+  return () => source.close();
+};
+
 // 获取AI法规解读
 export const getRegulationAnalysis = async (id) => {
   try {
     const response = await api.get(`/regulation/analyze/${id}`);
-    return response.data;
+    return await resolveJobResponse(response);
   } catch (error) {
     console.error('获取AI法规解读失败:', error);
     throw error;
@@ -58,17 +108,18 @@ export const getRegulationAnalysis = async (id) => {
 export const refreshRegulationAnalysis = async (id) => {
   try {
     const response = await api.post(`/regulation/analyze/refresh/${id}`);
-    return response.data;
+    return await resolveJobResponse(response);
   } catch (error) {
     console.error('刷新AI法规解读失败:', error);
     throw error;
   }
 };
 
-// 获取法规时间轴
-export const getRegulationsTimeline = async (limit = 20) => {
+// 获取法规时间轴（传入上一页返回的next_cursor可继续加载）
+export const getRegulationsTimeline = async (limit = 20, cursor = null) => {
   try {
-    const response = await api.get('/timeline', { params: { limit } });
+    const params = cursor ? { limit, cursor } : { limit };
+    const response = await api.get('/timeline', { params });
     return response.data;
   } catch (error) {
     console.error('获取法规时间轴失败:', error);
@@ -76,7 +127,18 @@ export const getRegulationsTimeline = async (limit = 20) => {
   }
 };
 
-// 运行爬虫
+// 获取法规数量统计（按年、月、分类、来源）
+export const getFacets = async () => {
+  try {
+    const response = await api.get('/stats/facets');
+    return response.data;
+  } catch (error) {
+    console.error('获取法规统计失败:', error);
+    throw error;
+  }
+};
+
+// 提交爬虫任务（后台执行，返回job_id，用waitForJob轮询进度）
 export const runCrawler = async (pages = 1) => {
   try {
     const response = await api.post('/crawler/run', { pages });
@@ -87,12 +149,45 @@ export const runCrawler = async (pages = 1) => {
   }
 };
 
+// 查询后台任务状态
+export const getJob = async (jobId) => {
+  try {
+    const response = await api.get(`/jobs/${jobId}`);
+    return response.data.job;
+  } catch (error) {
+    console.error('获取任务状态失败:', error);
+    throw error;
+  }
+};
+
+// 轮询后台任务直到结束，每次轮询通过onProgress回调当前任务状态
+export const waitForJob = async (jobId, { interval = 2000, onProgress } = {}) => {
+  for (;;) {
+    const job = await getJob(jobId);
+    if (onProgress) {
+      onProgress(job);
+    }
+    if (job.status === 'succeeded') {
+      return job;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || '任务执行失败');
+    }
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+};
+
 export default {
   getRegulations,
   getRegulationDetail,
+  getRegulationsBatch,
   interpretRegulation,
+  streamRegulationInterpretation,
   getRegulationAnalysis,
   refreshRegulationAnalysis,
   getRegulationsTimeline,
-  runCrawler
+  getFacets,
+  runCrawler,
+  getJob,
+  waitForJob
 }; 
\ No newline at end of file
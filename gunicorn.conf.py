@@ -0,0 +1,28 @@
+"""gunicorn配置：gunicorn -c gunicorn.conf.py backend.wsgi:app
+
+preload_app让主进程只执行一次模块导入、数据库迁移和应用创建，
+工作进程fork后在post_fork中重置数据库连接和缓存。
+每个工作进程有自己的响应缓存（通过数据库中的写入代数感知其他进程的写入）和后台任务线程池，
+因此LLM并发上限为 工作进程数 × LLM_JOB_WORKERS。
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+# gthread工作进程用线程处理请求，SSE流式解读等长连接不会占满工作进程
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True
+timeout = 60
+# 退出时给正在进行的请求留出时间完成
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', None)
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """每个工作进程fork后执行一次的初始化"""
+    from backend.app import init_worker
+    init_worker()
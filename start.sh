@@ -4,12 +4,20 @@
 echo "初始化数据库..."
 python database/init_db.py
 
-# 启动后端服务
-echo "启动后端服务..."
-# cd backend
-python backend/app.py &
+# 启动后端服务（./start.sh prod 使用多进程生产模式，默认使用开发服务器）
+MODE=${1:-dev}
+echo "启动后端服务（$MODE 模式）..."
+if [ "$MODE" = "prod" ]; then
+  if command -v gunicorn > /dev/null 2>&1; then
+    gunicorn -c gunicorn.conf.py backend.wsgi:app &
+  else
+    # Windows下没有gunicorn，使用waitress单进程多线程运行
+    waitress-serve --listen=0.0.0.0:5001 --threads=16 backend.wsgi:app &
+  fi
+else
+  python backend/app.py &
+fi
 BACKEND_PID=$!
-cd ..
 
 # 等待后端服务启动
 echo "等待后端服务启动..."
@@ -0,0 +1,93 @@
+"""DBOperations的法规查询测试
+
+运行（在项目根目录）:
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from database.db_operations import DBOperations
+
+
+class RegulationSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = DBOperations(os.path.join(self.tmp_dir, 'legalguard.db'), compress_content=False)
+        self.db.save_regulation(
+            title='劳动合同法', publish_date='2024-01-01', source='测试',
+            content='第一条 用人单位应当依法支付加班工资。', url='http://example.com/1'
+        )
+        self.db.save_regulation(
+            title='社会保险法', publish_date='2024-02-01', source='测试',
+            content='第一条 职工应当参加基本养老保险。', url='http://example.com/2'
+        )
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_blank_search_term_is_ignored(self):
+        for search_term in ('', ' ', ' \t\n'):
+            with self.subTest(search_term=search_term):
+                regulations = self.db.get_regulations(search_term=search_term)
+                self.assertEqual(len(regulations), 2)
+                self.assertNotIn('snippet', regulations[0])
+                self.assertEqual(self.db.count_regulations(search_term=search_term), 2)
+
+    def test_search_term_is_stripped(self):
+        regulations = self.db.get_regulations(search_term='  加班工资  ')
+        self.assertEqual([r['title'] for r in regulations], ['劳动合同法'])
+        self.assertEqual(self.db.count_regulations(search_term='  加班工资  '), 1)
+
+    def test_short_search_term_uses_like(self):
+        regulations = self.db.get_regulations(search_term=' 养老 ')
+        self.assertEqual([r['title'] for r in regulations], ['社会保险法'])
+        self.assertIn('<mark>养老</mark>', regulations[0]['snippet'])
+
+
+
+class WriteGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = DBOperations(os.path.join(self.tmp_dir, 'legalguard.db'), compress_content=False)
+        self.regulation_id = self.db.save_regulation(
+            title='劳动合同法', publish_date='2024-01-01', source='测试',
+            content='第一条 用人单位应当依法支付加班工资。', url='http://example.com/1'
+        )
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_regulation_data_writes_bump_generation(self):
+        generation = self.db.get_write_generation()
+        self.db.save_interpretation(self.regulation_id, '解读')
+        self.assertGreater(self.db.get_write_generation(), generation)
+
+        generation = self.db.get_write_generation()
+        self.db.update_regulation_analysis(self.regulation_id, {'summary': '摘要'})
+        self.assertGreater(self.db.get_write_generation(), generation)
+
+    def test_job_and_llm_cache_writes_keep_generation(self):
+        generation = self.db.get_write_generation()
+        job_id = self.db.create_job('crawl')
+        self.db.update_job(job_id, {'status': 'running'})
+        self.db.save_llm_cache_entry('key', 'model', 'response')
+        self.assertEqual(self.db.get_write_generation(), generation)
+
+    def test_writes_from_other_connections_bump_generation(self):
+        generation = self.db.get_write_generation()
+        conn = sqlite3.connect(self.db.db_path)
+        conn.execute("UPDATE regulations SET title = '劳动合同法（修订）' WHERE id = ?", (self.regulation_id,))
+        conn.commit()
+        conn.close()
+        self.assertGreater(self.db.get_write_generation(), generation)
+
+
+if __name__ == '__main__':
+    unittest.main()